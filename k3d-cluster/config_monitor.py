@@ -2,6 +2,11 @@
 import os
 import time
 import json
+import ctypes
+import ctypes.util
+import errno
+import select
+import struct
 import logging
 from pathlib import Path
 
@@ -14,23 +19,91 @@ logger = logging.getLogger('config-monitor')
 
 # Constants
 STATUS_FILE = '/usr/src/app/status.json'
-CHECK_INTERVAL = 10  # seconds
+# Mounted ConfigMap directory (one file per key) and optional KEY=VALUE env file; the first one that exists is
+# the config source, otherwise the container's environment is used (which can't change while we run)
+CONFIG_DIR = os.environ.get('CONFIG_DIR', '/etc/app-config')
+ENV_FILE = os.environ.get('CONFIG_ENV_FILE', '')
+# Setting -> ConfigMap key it comes from (REQUIRED_ENV should come from MISSING_KEY)
+CONFIG_KEYS = {
+    'REQUIRED_ENV': 'MISSING_KEY',
+    'CORRECT_KEY': 'CORRECT_KEY',
+}
+POLL_INTERVAL = 1  # seconds between checks when inotify isn't available
+# Seconds between touches of an unchanged STATUS_FILE, so readers can tell a live monitor from a dead one
+# (must stay well under the web service's STALE_AFTER)
+HEARTBEAT_INTERVAL = 20
+DEBOUNCE = 0.05  # seconds to let a burst of file events settle before re-checking
+
+# inotify(7) event masks
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_IGNORED = 0x8000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def watch_paths():
+    """Directories whose changes can change the config (ConfigMap updates swap a symlink inside CONFIG_DIR)"""
+    paths = [CONFIG_DIR]
+    if ENV_FILE:
+        # Watch the directory, so an env file replaced by rename is noticed too
+        paths.append(os.path.dirname(os.path.abspath(ENV_FILE)))
+    return [path for path in paths if os.path.isdir(path)]
+
+
+def read_env_file(path):
+    values = {}
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            values[key.strip()] = value.strip().strip('"\'')
+    return values
+
+
+def read_config():
+    """Return ({setting: value}, source description)"""
+    if os.path.isdir(CONFIG_DIR):
+        values = {}
+        for setting, key in CONFIG_KEYS.items():
+            path = os.path.join(CONFIG_DIR, key)
+            if os.path.isfile(path):
+                with open(path, 'r') as f:
+                    values[setting] = f.read().strip()
+        return values, f"ConfigMap volume {CONFIG_DIR}"
+    if ENV_FILE and os.path.isfile(ENV_FILE):
+        file_values = read_env_file(ENV_FILE)
+        values = {setting: file_values[key] for setting, key in CONFIG_KEYS.items() if key in file_values}
+        return values, f"env file {ENV_FILE}"
+    return {setting: os.environ.get(setting) for setting in CONFIG_KEYS}, "environment"
+
 
 def check_config():
     """Check if the required environment variable is set correctly"""
     try:
+        values, source = read_config()
         # Check for REQUIRED_ENV (which should come from MISSING_KEY in ConfigMap)
-        required_env = os.environ.get('REQUIRED_ENV')
+        required_env = values.get('REQUIRED_ENV')
 
         # Also check if the actual correct key's value is available
-        correct_value = os.environ.get('CORRECT_KEY')
+        correct_value = values.get('CORRECT_KEY')
 
         if required_env:
-            logger.info(f"REQUIRED_ENV is set to: {required_env}")
+            logger.info(f"REQUIRED_ENV is set to: {required_env} (from {source})")
             status = "healthy"
             message = "Configuration is properly set"
         else:
-            logger.warning("REQUIRED_ENV is not set!")
+            logger.warning(f"REQUIRED_ENV is not set! (checked {source})")
             if correct_value:
                 logger.info(f"However, CORRECT_KEY is available with value: {correct_value}")
                 message = "REQUIRED_ENV missing but CORRECT_KEY is available"
@@ -38,43 +111,184 @@ def check_config():
                 logger.warning("CORRECT_KEY is also not available")
                 message = "Both REQUIRED_ENV and CORRECT_KEY are missing"
             status = "unhealthy"
+        return status, message
+
+    except Exception as e:
+        logger.error(f"Error checking configuration: {str(e)}")
+        return "error", f"Error checking configuration: {str(e)}"
+
+
+def read_published():
+    """Status and sequence number already in STATUS_FILE (e.g. from before a container restart)"""
+    try:
+        with open(STATUS_FILE, 'r') as f:
+            published = json.load(f)
+        return (published.get('status'), published.get('message')), int(published.get('sequence', 0))
+    except Exception:
+        return None, 0
 
-        # Save status to file for the web service to read
-        result = {
-            "status": status,
-            "message": message,
-            "timestamp": time.time()
-        }
 
-        Path(STATUS_FILE).parent.mkdir(parents=True, exist_ok=True)
-        with open(STATUS_FILE, 'w') as f:
+def publish_status(status, message, sequence):
+    """Write the status for the web service to read, atomically: readers see the old file or the new one"""
+    result = {
+        "status": status,
+        "message": message,
+        "timestamp": time.time(),
+        # Increases by one on every change, so readers can tell whether they have seen this status
+        "sequence": sequence
+    }
+    Path(STATUS_FILE).parent.mkdir(parents=True, exist_ok=True)
+    temp_file = f"{STATUS_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file, 'w') as f:
             json.dump(result, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, STATUS_FILE)
+    except Exception:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
 
-        return status, message
 
-    except Exception as e:
-        logger.error(f"Error checking configuration: {str(e)}")
-        result = {
-            "status": "error",
-            "message": f"Error checking configuration: {str(e)}",
-            "timestamp": time.time()
-        }
+def heartbeat():
+    """Refresh STATUS_FILE's mtime without rewriting it; the status and its sequence stay as they are"""
+    os.utime(STATUS_FILE)
+
+
+class InotifyWatcher:
+    """Blocks until something changes in the watched directories (Linux inotify through libc)"""
+
+    def __init__(self, paths):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.lost = False
+        for path in paths:
+            wd = libc.inotify_add_watch(self.fd, path.encode(), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(error, f"inotify_add_watch failed for {path}")
+
+    def drain(self):
+        """Read all pending events; returns False once a watched directory has gone away"""
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    return not self.lost
+                raise
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size + length
+                if mask & IN_IGNORED:
+                    self.lost = True
+
+    def wait(self, timeout=None):
+        """Return True after a change or timeout, False if the watcher has to be re-opened"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return True
+        # ConfigMap updates and editors touch several files at once; check once they are done
+        time.sleep(DEBOUNCE)
+        return self.drain()
+
+    def close(self):
+        os.close(self.fd)
 
+
+class PollingWatcher:
+    """Fallback that stats the watched paths every POLL_INTERVAL seconds; nothing is read or written"""
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.signature = self.snapshot()
+
+    def snapshot(self):
+        signature = []
+        for path in self.paths:
+            try:
+                if os.path.isdir(path):
+                    for entry in sorted(os.scandir(path), key=lambda entry: entry.name):
+                        stat = entry.stat(follow_symlinks=False)
+                        signature.append((entry.path, stat.st_ino, stat.st_mtime_ns, stat.st_size))
+                else:
+                    stat = os.stat(path)
+                    signature.append((path, stat.st_ino, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None))
+        return signature
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                return True
+            time.sleep(POLL_INTERVAL)
+            signature = self.snapshot()
+            if signature != self.signature:
+                self.signature = signature
+                # Re-open, so inotify takes over if the watched paths have appeared
+                return False
+
+    def close(self):
+        pass
+
+
+def open_watcher():
+    paths = watch_paths()
+    if paths:
         try:
-            with open(STATUS_FILE, 'w') as f:
-                json.dump(result, f)
-        except:
-            logger.error("Could not write status file")
+            watcher = InotifyWatcher(paths)
+            logger.info(f"Watching {', '.join(paths)} for config changes with inotify")
+            return watcher
+        except (OSError, AttributeError) as e:
+            # AttributeError: no inotify in this libc (not Linux)
+            logger.warning(f"inotify unavailable ({e}), polling every {POLL_INTERVAL}s instead")
+    # Also covers config paths that don't exist yet
+    polled = [CONFIG_DIR] + ([os.path.abspath(ENV_FILE)] if ENV_FILE else [])
+    logger.info(f"Polling {', '.join(polled)} for config changes every {POLL_INTERVAL}s")
+    return PollingWatcher(polled)
 
-        return "error", str(e)
 
 def main():
     logger.info("Config monitoring service starting...")
+    published, sequence = read_published()
+    watcher = open_watcher()
+
+    last_write = 0
 
     while True:
         status, message = check_config()
-        logger.info(f"Config status: {status} - {message}")
-        time.sleep(CHECK_INTERVAL)
+        # Only a changed status is written; an idle monitor just touches the file every HEARTBEAT_INTERVAL
+        if (status, message) != published:
+            try:
+                publish_status(status, message, sequence + 1)
+                sequence += 1
+                published = (status, message)
+                last_write = time.monotonic()
+                logger.info(f"Config status: {status} - {message} (sequence {sequence})")
+            except Exception as e:
+                logger.error(f"Could not write status file: {str(e)}")
+                time.sleep(POLL_INTERVAL)
+                continue
+        elif time.monotonic() - last_write >= HEARTBEAT_INTERVAL:
+            try:
+                heartbeat()
+                last_write = time.monotonic()
+            except FileNotFoundError:
+                # Someone removed the file: publish the status again right away
+                published = None
+                continue
+            except Exception as e:
+                logger.error(f"Could not touch status file: {str(e)}")
+        if not watcher.wait(HEARTBEAT_INTERVAL):
+            watcher.close()
+            watcher = open_watcher()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
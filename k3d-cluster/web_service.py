@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import hashlib
 import json
 import os
+import threading
 import time
 import logging
-from pathlib import Path
+from collections import Counter
 
 # Set up logging
 logging.basicConfig(
@@ -21,126 +23,260 @@ DEFAULT_STATUS = {
     "timestamp": time.time()
 }
 SERVER_PORT = 8080
+STALE_AFTER = 60  # seconds without a status write or heartbeat before the data is marked stale
+# Never equal to a file signature, so the first request loads the file
+RELOAD = object()
 
-class StatusHandler(BaseHTTPRequestHandler):
-    def _set_headers(self, content_type='text/html'):
-        self.send_response(200)
-        self.send_header('Content-type', content_type)
-        self.end_headers()
 
-    def get_status(self):
-        """Read status from file, return default if not available"""
+class StatusCache:
+    """Parsed status.json and the pre-rendered responses for it.
+
+    The file is only re-read when its signature (mtime, size, inode) changes, and the pages are only
+    re-rendered when the file changes or the data turns stale; every other request is served from memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.signature = RELOAD
+        self.status_data = DEFAULT_STATUS
+        self.stale = False
+        self.responses = {}
+        self.reloads = 0
+
+    def file_signature(self):
         try:
-            if Path(STATUS_FILE).exists():
-                with open(STATUS_FILE, 'r') as f:
-                    status_data = json.load(f)
-                    # Check if data is stale (older than 1 minute)
-                    if time.time() - status_data.get('timestamp', 0) > 60:
-                        logger.warning("Status file data is stale")
-                        status_data['message'] += " (STALE DATA)"
-                return status_data
-            else:
-                logger.warning(f"Status file not found at {STATUS_FILE}")
-                return DEFAULT_STATUS
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def load(self, signature):
+        """Read status from file, use the default if not available"""
+        self.signature = signature
+        self.reloads += 1
+        if signature is None:
+            logger.warning(f"Status file not found at {self.path}")
+            self.status_data = DEFAULT_STATUS
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.status_data = json.load(f)
         except Exception as e:
+            # A file caught mid-write is re-read once the write completes, since that changes its size or mtime
             logger.error(f"Error reading status file: {str(e)}")
-            return DEFAULT_STATUS
+            self.status_data = DEFAULT_STATUS
+
+    def updated(self):
+        """When the monitor last wrote the status or, if it only writes on change, touched the file as a heartbeat"""
+        updated = self.status_data.get('timestamp', 0)
+        if self.signature not in (RELOAD, None):
+            updated = max(updated, self.signature[0] / 1e9)
+        return updated
+
+    def is_stale(self):
+        # Staleness only tells whether the monitor is alive; "sequence" is for change detection
+        if self.status_data is DEFAULT_STATUS:
+            return False
+        return time.time() - self.updated() > STALE_AFTER
+
+    def get(self):
+        """Return {path: (body, etag, content type)} for the current status"""
+        signature = self.file_signature()
+        with self.lock:
+            changed = signature != self.signature
+            if changed:
+                self.load(signature)
+            stale = self.is_stale()
+            if changed or stale != self.stale or not self.responses:
+                if stale and not self.stale:
+                    logger.warning("Status file data is stale")
+                self.stale = stale
+                self.responses = render_responses(self.status_data, stale)
+            return self.responses
+
+    def age(self):
+        with self.lock:
+            return time.time() - self.updated()
+
+
+def make_response(body, content_type):
+    etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+    return body, etag, content_type
+
+
+def render_responses(status_data, stale):
+    status_data = dict(status_data)
+    if stale:
+        status_data['message'] += " (STALE DATA)"
+    return {
+        '/health': make_response(json.dumps(status_data).encode(), 'application/json'),
+        '/': make_response(render_page(status_data).encode(), 'text/html; charset=utf-8'),
+    }
+
+
+def render_page(status_data):
+    # Get status emoji and color
+    if status_data['status'] == 'healthy':
+        emoji = '🤠'  # Cowboy face!
+        color = 'green'
+        bg_color = '#e6ffe6'  # Light green
+    elif status_data['status'] == 'unknown':
+        emoji = '😐'  # Neutral face
+        color = 'orange'
+        bg_color = '#fff9e6'  # Light yellow
+    else:
+        emoji = '😢'  # Sad face
+        color = 'red'
+        bg_color = '#ffe6e6'  # Light red
+
+    # Create the HTML response
+    return f'''
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Config Status</title>
+        <style>
+            body {{
+                font-family: Arial, sans-serif;
+                background-color: {bg_color};
+                display: flex;
+                justify-content: center;
+                align-items: center;
+                height: 100vh;
+                margin: 0;
+            }}
+            .container {{
+                text-align: center;
+                padding: 2rem;
+                border-radius: 10px;
+                box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
+                background-color: white;
+                max-width: 500px;
+            }}
+            .status {{
+                font-size: 100px;
+                margin: 20px 0;
+            }}
+            .message {{
+                color: {color};
+                font-weight: bold;
+                margin-bottom: 20px;
+            }}
+            .details {{
+                color: #666;
+                font-size: 0.9rem;
+            }}
+            .refresh {{
+                margin-top: 20px;
+                font-size: 0.8rem;
+                color: #999;
+            }}
+        </style>
+        <script>
+            // Auto-refresh every 10 seconds
+            setTimeout(function() {{
+                window.location.reload();
+            }}, 10000);
+        </script>
+    </head>
+    <body>
+        <div class="container">
+            <h1>Kubernetes Config Status</h1>
+            <div class="status">{emoji}</div>
+            <div class="message">Status: {status_data['status'].upper()}</div>
+            <div class="details">{status_data['message']}</div>
+        </div>
+    </body>
+    </html>
+    '''
+
+
+class Metrics:
+    """Request counters for /metrics, shared by all handler threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.started = time.time()
+
+    def count(self, path, code):
+        with self.lock:
+            self.requests[(path, code)] += 1
+
+    def render(self, cache):
+        lines = [
+            '# HELP web_service_requests_total Requests served, by path and status code.',
+            '# TYPE web_service_requests_total counter',
+        ]
+        with self.lock:
+            requests = sorted(self.requests.items())
+        for (path, code), count in requests:
+            lines.append(f'web_service_requests_total{{path="{path}",code="{code}"}} {count}')
+        status = cache.status_data.get('status', 'unknown')
+        lines += [
+            '# HELP web_service_status_reloads_total Times status.json was re-read after it changed or was touched.',
+            '# TYPE web_service_status_reloads_total counter',
+            f'web_service_status_reloads_total {cache.reloads}',
+            '# HELP web_service_config_healthy Whether the config monitor last reported a healthy configuration.',
+            '# TYPE web_service_config_healthy gauge',
+            f'web_service_config_healthy {1 if status == "healthy" else 0}',
+            '# HELP web_service_status_age_seconds Seconds since the config monitor last wrote its status or heartbeat.',
+            '# TYPE web_service_status_age_seconds gauge',
+            f'web_service_status_age_seconds {cache.age():.3f}',
+            '# HELP web_service_status_sequence Change sequence number of the status being served.',
+            '# TYPE web_service_status_sequence gauge',
+            f'web_service_status_sequence {cache.status_data.get("sequence", 0)}',
+            '# HELP web_service_uptime_seconds Seconds since the web service started.',
+            '# TYPE web_service_uptime_seconds gauge',
+            f'web_service_uptime_seconds {time.time() - self.started:.3f}',
+        ]
+        return ('\n'.join(lines) + '\n').encode()
+
+
+status_cache = StatusCache(STATUS_FILE)
+metrics = Metrics()
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so probes and the page's auto-refresh can reuse their connections
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, code, body=b'', content_type=None, etag=None):
+        self.send_response(code)
+        if content_type:
+            self.send_header('Content-type', content_type)
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
 
     def do_GET(self):
         """Handle GET requests"""
-        if self.path == '/health':
-            # Health endpoint returns JSON
-            self._set_headers('application/json')
-            status_data = self.get_status()
-            self.wfile.write(json.dumps(status_data).encode())
+        path = self.path.split('?', 1)[0]
+        if path == '/metrics':
+            metrics.count(path, 200)
+            self._send(200, metrics.render(status_cache), 'text/plain; version=0.0.4')
+            return
+
+        # Health endpoint returns JSON; every other path returns HTML with happy/sad face
+        key = '/health' if path == '/health' else '/'
+        body, etag, content_type = status_cache.get()[key]
+        if etag in self.headers.get('If-None-Match', ''):
+            metrics.count(key, 304)
+            self._send(304, etag=etag)
             return
+        metrics.count(key, 200)
+        self._send(200, body, content_type, etag)
 
-        # Default path returns HTML with happy/sad face
-        self._set_headers()
-        status_data = self.get_status()
-
-        # Get status emoji and color
-        if status_data['status'] == 'healthy':
-            emoji = '🤠'  # Cowboy face!
-            color = 'green'
-            bg_color = '#e6ffe6'  # Light green
-        elif status_data['status'] == 'unknown':
-            emoji = '😐'  # Neutral face
-            color = 'orange'
-            bg_color = '#fff9e6'  # Light yellow
-        else:
-            emoji = '😢'  # Sad face
-            color = 'red'
-            bg_color = '#ffe6e6'  # Light red
-
-        # Create the HTML response
-        html = f'''
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Config Status</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    background-color: {bg_color};
-                    display: flex;
-                    justify-content: center;
-                    align-items: center;
-                    height: 100vh;
-                    margin: 0;
-                }}
-                .container {{
-                    text-align: center;
-                    padding: 2rem;
-                    border-radius: 10px;
-                    box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
-                    background-color: white;
-                    max-width: 500px;
-                }}
-                .status {{
-                    font-size: 100px;
-                    margin: 20px 0;
-                }}
-                .message {{
-                    color: {color};
-                    font-weight: bold;
-                    margin-bottom: 20px;
-                }}
-                .details {{
-                    color: #666;
-                    font-size: 0.9rem;
-                }}
-                .refresh {{
-                    margin-top: 20px;
-                    font-size: 0.8rem;
-                    color: #999;
-                }}
-            </style>
-            <script>
-                // Auto-refresh every 10 seconds
-                setTimeout(function() {{
-                    window.location.reload();
-                }}, 10000);
-            </script>
-        </head>
-        <body>
-            <div class="container">
-                <h1>Kubernetes Config Status</h1>
-                <div class="status">{emoji}</div>
-                <div class="message">Status: {status_data['status'].upper()}</div>
-                <div class="details">{status_data['message']}</div>
-            </div>
-        </body>
-        </html>
-        '''
-
-        self.wfile.write(html.encode())
 
 def run_server():
     server_address = ('', SERVER_PORT)
-    httpd = HTTPServer(server_address, StatusHandler)
+    httpd = ThreadingHTTPServer(server_address, StatusHandler)
     logger.info(f'Starting web server on port {SERVER_PORT}...')
     try:
         httpd.serve_forever()
@@ -149,4 +285,4 @@ def run_server():
         httpd.server_close()
 
 if __name__ == '__main__':
-    run_server()
\ No newline at end of file
+    run_server()
@@ -1,7 +1,13 @@
 # File: pod-patrol/agent_wrapper.py
 
+import asyncio
+from dataclasses import replace
 from agents import Agent, Runner, RunConfig
 from context_manager import ContextManager
+from answer_cache import AnswerCache
+from streaming import StreamPrinter
+from prefetch import prefetch_tools
+from telemetry import tracer, record_usage
 from constants import CANDIDATE_ANSWER_MODEL
 
 starter_run_config = RunConfig(
@@ -12,21 +18,99 @@ starter_run_config = RunConfig(
 This wrapper class is used to wrap an agent and provide a context manager for the agent.
 It also provides a last_response attribute to store the last response from the agent.
 It also provides a evaluated attribute to store the evaluation of the last response.
+verifier_votes and verifier_latencies hold the per-verifier breakdown of that evaluation (None = abstained).
+candidates_spent is set on the winner of verify_candidates to the number of candidates that were generated.
+With an answer_cache, a question asked again at the same point of a conversation against unchanged cluster state is
+answered without running the agent (cache_hit is set and result is left untouched).
+With a StreamPrinter (stream), the agent runs with Runner.run_streamed and its output and tool calls are printed as
+they arrive.
+The conversation and cluster context (get_context()) is sent to the model as a message ahead of the question;
+Runner's context= argument only reaches tools and hooks, so it just carries the same text for local use.
+With prefetch, an agent that has tools starts fetching the cluster data the question points at (see prefetch.py)
+alongside its first model turn, so its tool calls find the results in the tool cache.
 """
 
 
+def model_input(question: str, context: str):
+    if not context:
+        return question
+    return [
+        {"role": "user", "content": f"Context (conversation so far and cluster state):\n{context}"},
+        {"role": "user", "content": question},
+    ]
+
+
 class AgentWrapper():
-    def __init__(self, agent: Agent, run_config: RunConfig = starter_run_config, context_manager: ContextManager = None):
+    def __init__(self, agent: Agent, run_config: RunConfig = starter_run_config, context_manager: ContextManager = None,
+                 answer_cache: AnswerCache = None, stream: StreamPrinter = None, prefetch: bool = True):
         self.agent = agent
         self.run_config = run_config
         self.result = ""
         self.context_manager = context_manager or ContextManager()
         self.evaluated = 0
+        self.verifier_votes = {}
+        self.verifier_latencies = {}
+        self.candidates_spent = 0
+        self.answer_cache = answer_cache
+        self.cache_hit = False
+        self.stream = stream
+        self.prefetch = prefetch
 
     async def get_response(self, question: str):
+        with tracer.span("agent_run", agent=self.agent.name, model=str(self.run_config.model)) as span:
+            return await self.run_agent(question, span)
+
+    async def run_agent(self, question: str, span):
+        self.cache_hit = False
+        fingerprint = None
+        # Rendered before the question is added, so the same point in a conversation gives the same cache key
         prompt = self.context_manager.get_context()
-        self.result = await Runner.run(self.agent, question, run_config=self.run_config, context=prompt)
+        if self.answer_cache is not None:
+            cached_answer, fingerprint = await self.answer_cache.lookup(self.cache_scope(), question, prompt)
+            if cached_answer is not None:
+                self.cache_hit = True
+                span.add("cache_hits", propagate=True)
+                span.set("answer_cache", "hit")
+                self.context_manager.add_user_input(question)
+                self.context_manager.add_assistant_response(cached_answer)
+                return cached_answer
+
+        prefetch = None
+        if self.prefetch and self.agent.tools:
+            prefetch = asyncio.create_task(prefetch_tools(question, self.context_manager.history))
+        try:
+            if self.stream is None:
+                self.result = await Runner.run(self.agent, model_input(question, prompt), run_config=self.run_config,
+                                               context=prompt)
+            else:
+                self.stream.printed_text = False
+                self.result = Runner.run_streamed(self.agent, model_input(question, prompt), run_config=self.run_config,
+                                                  context=prompt)
+                async for event in self.result.stream_events():
+                    self.stream.event(event)
+                self.stream.finish()
+                # stream_events swallows a cancellation and just stops; a run cut short has no answer to record
+                if asyncio.current_task().cancelling() or not self.result.is_complete:
+                    raise asyncio.CancelledError()
+                if self.stream.printed_text:
+                    # Lets the caller know the answer is already on screen
+                    span.add("streamed_answers", propagate=True)
+        finally:
+            # Whatever it hasn't fetched by now, the agent no longer needs
+            if prefetch is not None:
+                prefetch.cancel()
+        record_usage(self.result, span)
         self.context_manager.add_user_input(question)
         self.context_manager.add_assistant_response(self.result.final_output)
         candidate_answer = self.result.final_output
+        if fingerprint is not None:
+            self.answer_cache.set(self.cache_scope(), question, fingerprint, candidate_answer, prompt)
         return candidate_answer
+
+    def with_model(self, model: str):
+        # Same agent, conversation and answer cache on a different model
+        return AgentWrapper(self.agent, replace(self.run_config, model=model), self.context_manager, self.answer_cache,
+                            self.stream, self.prefetch)
+
+    def cache_scope(self):
+        return f"{self.agent.name}|{self.run_config.model}"
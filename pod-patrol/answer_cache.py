@@ -0,0 +1,117 @@
+# File: pod-patrol/answer_cache.py
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from collections import OrderedDict
+from question_targets import extract_namespaces
+from constants import ANSWER_CACHE_PATH, ANSWER_CACHE_MAX_ENTRIES
+
+"""
+Cache of final answers keyed by the normalized question and a hash of the conversation context it was asked in,
+plus a fingerprint of the cluster state the answer depends on (pod phases/statuses, restart counts and event
+resource versions of the namespaces the question mentions). A follow-up like "and the other one?" only matches
+in the same conversation. The fingerprint is taken from a freshly fetched snapshot, and a lookup whose fingerprint
+no longer matches drops the entry, so any cluster change invalidates it. Entries are LRU-evicted and persisted to
+a JSON file shared across sessions.
+"""
+
+
+def normalize_question(question: str) -> str:
+    question = " ".join(question.lower().split())
+    return re.sub(r"[\s?!.]+$", "", question)
+
+
+def snapshot_fingerprint(snapshots: list) -> str:
+    digest = hashlib.sha256()
+    for snapshot in snapshots:
+        for pod in sorted(snapshot.pods, key=lambda pod: (pod.namespace, pod.name)):
+            digest.update(f"pod|{pod.namespace}|{pod.name}|{pod.phase}|{pod.status}|{pod.restart_count}\n".encode())
+        for event in sorted(snapshot.events, key=lambda event: (event.namespace, event.resource_version)):
+            digest.update(f"event|{event.namespace}|{event.resource_version}|{event.count}\n".encode())
+    return digest.hexdigest()
+
+
+async def cluster_fingerprint(question: str) -> str:
+    # Imported here: tools pulls in the agents SDK, which answer_cache itself doesn't need
+    from tools import fresh_snapshot
+    # Not the cached snapshot: that can be up to TOOL_CACHE_TTL old, and would hide a change made since
+    snapshots = await asyncio.gather(*[fresh_snapshot(namespace) for namespace in extract_namespaces(question)])
+    return snapshot_fingerprint(snapshots)
+
+
+class AnswerCache():
+    def __init__(self, path: str = ANSWER_CACHE_PATH, max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.path = os.path.expanduser(path) if path else None
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def key(self, scope: str, question: str, context: str = "") -> str:
+        # context: the rendered conversation context the question is asked in ("" for a fresh conversation)
+        conversation = hashlib.sha256(context.encode()).hexdigest()[:16] if context else ""
+        return f"{scope}|{conversation}|{normalize_question(question)}"
+
+    def get(self, scope: str, question: str, fingerprint: str, context: str = ""):
+        key = self.key(scope, question, context)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry["fingerprint"] != fingerprint:
+            # Cluster changed since this answer was given
+            del self.entries[key]
+            self.save()
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry["answer"]
+
+    async def lookup(self, scope: str, question: str, context: str = ""):
+        # Returns (cached answer or None, fingerprint). fingerprint is None when the cluster
+        # state couldn't be read; nothing should be cached for that question then.
+        try:
+            fingerprint = await cluster_fingerprint(question)
+        except Exception as e:
+            print(f"Skipping answer cache, could not read cluster state: {e}")
+            return None, None
+        return self.get(scope, question, fingerprint, context), fingerprint
+
+    def set(self, scope: str, question: str, fingerprint: str, answer: str, context: str = ""):
+        key = self.key(scope, question, context)
+        self.entries[key] = {"fingerprint": fingerprint, "answer": answer, "created": time.time()}
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.save()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable answer cache {self.path}: {e}")
+            return
+        for key, entry in stored.items():
+            self.entries[key] = entry
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def save(self):
+        if not self.path:
+            return
+        # Write to a temp file and rename so a crash never leaves a half-written cache
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False, suffix=".tmp") as f:
+            json.dump(self.entries, f)
+        os.replace(f.name, self.path)
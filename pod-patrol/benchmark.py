@@ -0,0 +1,196 @@
+# File: pod-patrol/benchmark.py
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from tap import Tap
+from agents import set_tracing_disabled
+from agent_wrapper import starter_run_config
+from judge_agent import verify_candidates, o3_mini_run_config
+from context_manager import ContextManager
+from tool_cache import tool_cache
+from k8s_backend import create_backend, set_backend
+from replay import FixtureBackend, ScriptedModelProvider, record_fixture
+from telemetry import tracer
+from constants import CANDIDATE_CONCURRENCY, ADAPTIVE_SCORE_THRESHOLD
+
+"""
+Offline benchmark for verify_candidates.
+Each scenario in benchmark_fixtures/ is replayed through FixtureBackend while every agent runs on a
+ScriptedModel, so a run needs no network, no cluster and no API key, and makes the same tool calls every time.
+For each scenario and candidate_num it reports wall time, tool calls (tool spans), backend calls (after caching and
+in-flight sharing), model turns, tokens, candidates spent and candidates verified per second.
+--adaptive benchmarks adaptive validation; --weak_models makes the cheap model's candidates miss the root cause so
+the escalation path is exercised. --verifier_tools measures the per-verifier tool calls that the shared evidence
+bundle replaces, and --no_prefetch the fetches that the candidates' tool prefetch takes out of their model turns.
+--output saves the results; --baseline compares against a saved file and exits non-zero when latency or backend
+calls grew by more than --max_regression, or the number of tool calls or model turns went up.
+
+python benchmark.py --candidate_nums 1 3 5 --output bench.json
+python benchmark.py --record my-scenario --question "..." --namespace default   # capture a fixture from a live cluster
+"""
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+# Fixed by the scripted model; backend calls can vary a little (failed calls aren't cached), so they get the tolerance
+COUNTED_METRICS = ["tool_calls", "model_turns"]
+
+
+class BenchmarkInputs(Tap):
+    scenarios: list[str] = []  # Fixture names in benchmark_fixtures/ (default: all of them)
+    candidate_nums: list[int] = [1, 3, 5]  # candidate_num values to measure
+    iterations: int = 3  # Runs per scenario and candidate_num
+    candidate_concurrency: int = CANDIDATE_CONCURRENCY  # Passed through to verify_candidates
+    early_exit: bool = False  # Passed through to verify_candidates
+    adaptive: bool = False  # Passed through to verify_candidates (candidate_nums are then budgets)
+    score_threshold: float = ADAPTIVE_SCORE_THRESHOLD  # Passed through to verify_candidates
+    verifier_tools: bool = False  # Verifiers fetch their own evidence with tools (shared_evidence=False)
+    no_prefetch: bool = False  # Candidates don't prefetch tool results (prefetch=False)
+    weak_models: list[str] = []  # Model names whose scripted candidates answer without naming the root cause
+    model_latency: float = 0.05  # Seconds the scripted model takes per turn
+    latency_scale: float = 1.0  # Multiplier on the fixtures' backend latencies (0 = instant backend)
+    output: str = ""  # Write the results to this JSON file
+    baseline: str = ""  # Results file from an earlier run to check for regressions
+    max_regression: float = 0.25  # Allowed relative increase in mean latency and backend calls over the baseline
+    verbose: bool = False  # Show the agents' and tools' output
+    record: str = ""  # Record a new fixture with this scenario name from the current cluster instead of benchmarking
+    question: str = ""  # Question stored with a recorded fixture
+    namespace: str = "default"  # Namespace to record
+    pod: str = ""  # Pod a recorded fixture targets (default: the first unhealthy pod), for faults pods don't show
+    expected: str = ""  # Root-cause keyword the scripted verifiers look for in answers to a recorded fixture
+    answer: str = ""  # Reference answer the scripted candidates give for a recorded fixture
+
+
+def load_fixtures(names: list) -> list:
+    names = names or sorted(name[:-len(".json")] for name in os.listdir(FIXTURE_DIR) if name.endswith(".json"))
+    fixtures = []
+    for name in names:
+        with open(os.path.join(FIXTURE_DIR, f"{name}.json")) as f:
+            fixtures.append(json.load(f))
+    return fixtures
+
+def use_scripted_model(provider: ScriptedModelProvider):
+    # Candidates and verifiers both resolve their model through these run configs
+    for run_config in [starter_run_config, o3_mini_run_config]:
+        run_config.model_provider = provider
+        run_config.tracing_disabled = True
+
+async def run_once(inputs: BenchmarkInputs, fixture: dict, candidate_num: int, backend: FixtureBackend,
+                   provider: ScriptedModelProvider) -> dict:
+    tool_cache.invalidate()
+    tracer.spans.clear()
+    backend.calls.clear()
+    provider.reset()
+    output = contextlib.nullcontext() if inputs.verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    with output, tracer.span("benchmark", scenario=fixture["scenario"], candidate_num=candidate_num) as span:
+        winner = await verify_candidates(fixture["question"], candidate_num, ContextManager(),
+                                         inputs.candidate_concurrency, inputs.early_exit,
+                                         adaptive=inputs.adaptive, score_threshold=inputs.score_threshold,
+                                         shared_evidence=not inputs.verifier_tools, prefetch=not inputs.no_prefetch)
+    return {
+        "latency": time.perf_counter() - start,
+        "tool_calls": sum(1 for recorded in tracer.spans if recorded.name.startswith("tool.")),
+        "backend_calls": sum(backend.calls.values()),
+        "model_turns": provider.turns,
+        "tokens": span.attributes.get("tokens.total", 0),
+        "score": winner.evaluated,
+        "candidates_spent": winner.candidates_spent,
+    }
+
+async def run_benchmarks(inputs: BenchmarkInputs) -> list:
+    results = []
+    for fixture in load_fixtures(inputs.scenarios):
+        backend = FixtureBackend(fixture, inputs.latency_scale)
+        provider = ScriptedModelProvider(fixture, inputs.model_latency, inputs.weak_models)
+        set_backend(backend)
+        use_scripted_model(provider)
+        for candidate_num in inputs.candidate_nums:
+            runs = [await run_once(inputs, fixture, candidate_num, backend, provider) for _ in range(inputs.iterations)]
+            latencies = [run["latency"] for run in runs]
+            mean = statistics.mean(latencies)
+            spent = statistics.mean(run["candidates_spent"] for run in runs)
+            results.append({
+                "scenario": fixture["scenario"],
+                "candidate_num": candidate_num,
+                "latency_mean": mean,
+                "latency_p50": statistics.median(latencies),
+                "latency_max": max(latencies),
+                # Worst case over the iterations
+                **{metric: max(run[metric] for run in runs) for metric in COUNTED_METRICS + ["backend_calls", "tokens"]},
+                "score": min(run["score"] for run in runs),
+                "candidates_spent": spent,
+                "candidates_per_second": spent / mean if mean else 0.0,
+            })
+            print(f"{fixture['scenario']} candidate_num={candidate_num}: {mean:.3f}s")
+    return results
+
+def results_table(results: list) -> str:
+    header = (f"{'Scenario':<22}{'Cand':>6}{'Mean s':>9}{'P50 s':>9}{'Max s':>9}{'Tools':>7}{'Backend':>9}"
+              f"{'Turns':>7}{'Tokens':>9}{'Score':>7}{'Spent':>7}{'Cand/s':>8}")
+    lines = [header, "-" * len(header)]
+    for result in results:
+        lines.append(f"{result['scenario']:<22}{result['candidate_num']:>6}{result['latency_mean']:>9.3f}"
+                     f"{result['latency_p50']:>9.3f}{result['latency_max']:>9.3f}{result['tool_calls']:>7}"
+                     f"{result['backend_calls']:>9}{result['model_turns']:>7}{result['tokens']:>9}"
+                     f"{result['score']:>7.2f}{result['candidates_spent']:>7.1f}{result['candidates_per_second']:>8.2f}")
+    return "\n".join(lines)
+
+def find_regressions(results: list, baseline: list, max_regression: float) -> list:
+    previous = {(result["scenario"], result["candidate_num"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["scenario"], result["candidate_num"]))
+        if before is None:
+            continue
+        name = f"{result['scenario']} candidate_num={result['candidate_num']}"
+        if result["latency_mean"] > before["latency_mean"] * (1 + max_regression):
+            regressions.append(f"{name}: mean latency {before['latency_mean']:.3f}s -> {result['latency_mean']:.3f}s")
+        if result["backend_calls"] > before["backend_calls"] * (1 + max_regression):
+            regressions.append(f"{name}: backend_calls {before['backend_calls']} -> {result['backend_calls']}")
+        for metric in COUNTED_METRICS:
+            if result[metric] > before[metric]:
+                regressions.append(f"{name}: {metric} {before[metric]} -> {result[metric]}")
+    return regressions
+
+async def record(inputs: BenchmarkInputs):
+    backend = create_backend()
+    try:
+        fixture = await record_fixture(backend, inputs.record, inputs.question, inputs.namespace,
+                                       inputs.expected, inputs.answer, inputs.pod)
+    finally:
+        await backend.close()
+    path = os.path.join(FIXTURE_DIR, f"{inputs.record}.json")
+    with open(path, "w") as f:
+        json.dump(fixture, f, indent=1)
+    print(f"Recorded {len(fixture['pods']['items'])} pods, {len(fixture['events']['items'])} events and "
+          f"{len(fixture['logs'])} logs to {path}")
+
+async def main():
+    inputs = BenchmarkInputs().parse_args()
+    if inputs.record:
+        await record(inputs)
+        return
+
+    set_tracing_disabled(True)
+    results = await run_benchmarks(inputs)
+    print("\n" + results_table(results))
+    if inputs.output:
+        with open(inputs.output, "w") as f:
+            json.dump(results, f, indent=1)
+        print(f"Results written to {inputs.output}")
+    if inputs.baseline:
+        with open(inputs.baseline) as f:
+            regressions = find_regressions(results, json.load(f), inputs.max_regression)
+        if regressions:
+            print("\nPerformance regressions against " + inputs.baseline + ":\n" + "\n".join(regressions))
+            sys.exit(1)
+        print(f"No regressions against {inputs.baseline}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,2 +1,83 @@
 CANDIDATE_ANSWER_MODEL = "o3-mini"
-VERIFIER_MODEL = "gpt-4o-mini"
\ No newline at end of file
+VERIFIER_MODEL = "gpt-4o-mini"
+
+# Max number of candidate answers generated at the same time in validation mode
+CANDIDATE_CONCURRENCY = 3
+
+# Seconds each aspect verifier gets before its vote counts as an abstention
+VERIFIER_TIMEOUT = 60
+
+# Adaptive validation: cheaper model the first round of candidates uses, size of that round, verifier score that
+# ends validation early, and best round score below which the next round switches to CANDIDATE_ANSWER_MODEL
+CANDIDATE_CHEAP_MODEL = "gpt-4o-mini"
+ADAPTIVE_INITIAL_CANDIDATES = 1
+ADAPTIVE_SCORE_THRESHOLD = 1.0
+ADAPTIVE_LOW_SCORE = 0.5
+
+# Shared kubectl tool cache: seconds an entry stays fresh, and max entries before LRU eviction
+TOOL_CACHE_TTL = 30
+TOOL_CACHE_MAX_ENTRIES = 256
+
+# Kubernetes backend used by the tools: "auto" (API client if credentials are found, else kubectl), "api" or "kubectl"
+K8S_BACKEND = "auto"
+# Optional API server override, e.g. "http://127.0.0.1:8001" for `kubectl proxy` or a local fake API server
+K8S_API_SERVER_ENV = "POD_PATROL_API_SERVER"
+K8S_API_TOKEN_ENV = "POD_PATROL_API_TOKEN"
+K8S_REQUEST_TIMEOUT = 60
+K8S_MAX_CONNECTIONS = 20
+# Log retrieval: default/max tail lines, hard cap on bytes pulled from the server, and max characters returned to the agent
+LOG_TAIL_LINES = 500
+LOG_MAX_TAIL_LINES = 5000
+LOG_LIMIT_BYTES = 5 * 1024 * 1024
+LOG_MAX_OUTPUT_CHARS = 8000
+# Max kubectl processes running at once when the kubectl backend is used
+KUBECTL_MAX_PROCESSES = 8
+
+# Conversation context: rough token budget for get_context(), number of recent messages kept verbatim,
+# and max characters kept from each older message once it is summarized
+CONTEXT_TOKEN_BUDGET = 4000
+CONTEXT_WINDOW_MESSAGES = 8
+CONTEXT_SUMMARY_CHARS = 200
+
+# Background pod watcher: server-side watch timeout before reconnecting, and reconnect backoff bounds (seconds)
+WATCH_TIMEOUT_SECONDS = 300
+WATCH_BACKOFF_INITIAL = 1
+WATCH_BACKOFF_MAX = 30
+
+# Batch diagnosis: pods diagnosed at once, log lines read per pod, and log characters kept per failure group
+DIAGNOSIS_CONCURRENCY = 10
+DIAGNOSIS_LOG_LINES = 100
+DIAGNOSIS_LOG_CHARS = 1500
+
+# Answer cache: persistent store location and max entries kept (least recently used are evicted)
+ANSWER_CACHE_PATH = "~/.cache/pod-patrol/answers.json"
+ANSWER_CACHE_MAX_ENTRIES = 200
+
+# Max finished spans kept in memory for the trace export and summary table
+TRACE_MAX_SPANS = 100000
+
+# Server/batch mode: requests answered at once, seconds before a request is abandoned, and max request body size
+SERVICE_MAX_CONCURRENCY = 8
+SERVICE_REQUEST_TIMEOUT = 600
+SERVICE_MAX_BODY_BYTES = 64 * 1024
+
+# Shared verifier evidence: max pods described and logged per question, log lines read per pod, and max characters
+# kept per evidence section
+EVIDENCE_MAX_PODS = 3
+EVIDENCE_LOG_LINES = 200
+EVIDENCE_SECTION_CHARS = 4000
+
+# Fleet scan: clusters scanned at once; per cluster, max API connections (or kubectl processes), requests per
+# second and burst size; and max workloads listed in the report given to the agent
+SCAN_MAX_CLUSTERS = 16
+SCAN_CLUSTER_CONNECTIONS = 4
+SCAN_CLUSTER_QPS = 20
+SCAN_CLUSTER_BURST = 40
+SCAN_MAX_LISTED = 25
+
+# Failure-signature rules: max pods matched per question (the question's pods, or the namespace's unhealthy ones)
+RULES_MAX_PODS = 5
+
+# Tool prefetch: max pods whose logs are fetched ahead of the agent, and how many recent messages are searched for names
+PREFETCH_MAX_PODS = 3
+PREFETCH_HISTORY_MESSAGES = 4
@@ -1,27 +1,122 @@
+from constants import CONTEXT_TOKEN_BUDGET, CONTEXT_WINDOW_MESSAGES, CONTEXT_SUMMARY_CHARS
+
+"""
+Conversation + cluster context handed to the agents.
+The most recent messages are kept verbatim; older ones are folded one at a time into short summary
+lines, so history stays bounded over a long session. get_context() is cached and only re-rendered
+after the history or container statuses change, and it is kept under a rough token budget.
+An optional background (e.g. a fleet scan report) is rendered ahead of the conversation and never summarized.
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting
+    return len(text) // 4 + 1
+
+
+def summarize_message(item: dict) -> str:
+    content = " ".join(item["content"].split())
+    if len(content) > CONTEXT_SUMMARY_CHARS:
+        content = content[:CONTEXT_SUMMARY_CHARS].rstrip() + "..."
+    return f"- {item['role']}: {content}"
+
+
 class ContextManager:
-    def __init__(self):
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET, window_messages: int = CONTEXT_WINDOW_MESSAGES,
+                 summarizer=summarize_message):
         self.history = []
+        self.summary = []
         self.containers = {}
+        self.background = ""
+        self.token_budget = token_budget
+        self.window_messages = window_messages
+        self.summarizer = summarizer
+        self.rendered = None
+
+    def fork(self):
+        # Copy used so concurrent candidates don't write into each other's history
+        forked = ContextManager(self.token_budget, self.window_messages, self.summarizer)
+        forked.history = list(self.history)
+        forked.summary = list(self.summary)
+        forked.containers = dict(self.containers)
+        forked.background = self.background
+        forked.rendered = self.rendered
+        return forked
 
     def add_user_input(self, question: str):
         self.history.append({"role": "user", "content": question})
+        self.compact()
     def add_assistant_response(self, response: str):
         self.history.append({"role": "assistant", "content": response})
+        self.compact()
+
+    def add_note(self, note: str):
+        # Findings gathered for the next question (e.g. rule-engine matches), kept in the history like a message
+        self.history.append({"role": "note", "content": note})
+        self.compact()
+
+    def set_background(self, text: str):
+        self.background = text
+        self.rendered = None
+
+    def compact(self):
+        # Fold messages that fell out of the window into the summary
+        self.rendered = None
+        while len(self.history) > self.window_messages:
+            self.summary.append(self.summarizer(self.history.pop(0)))
+        # The summary itself gets at most half the budget; the oldest lines go first
+        while len(self.summary) > 1 and estimate_tokens("\n".join(self.summary)) > self.token_budget // 2:
+            self.summary.pop(0)
 
     def get_context(self):
-        context = "\n".join([f"{item['role']}: {item['content']}" for item in self.history])
+        if self.rendered is None:
+            self.rendered = self.render()
+        return self.rendered
+
+    def render_conversation(self):
+        context = ""
+        if self.summary:
+            context += "Earlier conversation (summarized):\n" + "\n".join(self.summary) + "\n\n"
+        context += "\n".join([f"{item['role']}: {item['content']}" for item in self.history])
+        return context
+
+    def render(self):
+        # The background comes out of the conversation's share of the budget
+        budget = max(self.token_budget - estimate_tokens(self.background), 1) if self.background else self.token_budget
+        context = self.render_conversation()
+        # Over budget: summarize more of the window (keeping the last exchange), then drop the oldest summaries
+        while estimate_tokens(context) > budget and (len(self.history) > 2 or self.summary):
+            if len(self.history) > 2:
+                self.summary.append(self.summarizer(self.history.pop(0)))
+            else:
+                self.summary.pop(0)
+            context = self.render_conversation()
+        if estimate_tokens(context) > budget:
+            context = "..." + context[-budget * 4:]
+        if self.background:
+            context = self.background + "\n\n" + context
+
         if self.containers:
-            context += "\n\nContainer Statuses:\n"
+            remaining = self.token_budget - estimate_tokens(context)
+            lines = []
             for container_name, status in self.containers.items():
-                context += f"- {container_name}: {status}\n"
+                line = f"- {container_name}: {status}\n"
+                remaining -= estimate_tokens(line)
+                if remaining < 0:
+                    lines.append(f"- ... and {len(self.containers) - len(lines)} more containers\n")
+                    break
+                lines.append(line)
+            context += "\n\nContainer Statuses:\n" + "".join(lines)
         return context
 
     def update_container_status(self, container_name: str, status: str):
         self.containers[container_name] = status
+        self.rendered = None
     
     def remove_container(self, container_name: str):
         if container_name in self.containers:
             del self.containers[container_name]
+            self.rendered = None
 
     def get_container_status(self, container_name: str):
         return self.containers[container_name]
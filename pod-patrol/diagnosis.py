@@ -0,0 +1,88 @@
+# File: pod-patrol/diagnosis.py
+
+from collections import defaultdict
+from dataclasses import dataclass
+from log_filter import LogFilter, SEVERITY_LEVELS, FINGERPRINT_PATTERN
+from snapshot import PodRecord, summarize_pod
+
+"""
+Grouping for the batch diagnosis tool.
+Each unhealthy pod gets a failure signature (pod status, the failing container's state reason,
+exit codes and a fingerprint of its last warning/error log line). Pods with the same signature
+are reported as one group with a single representative, so 200 crash-looping replicas come back
+as one entry instead of 200.
+"""
+
+# Member names listed per group; the rest are counted
+MAX_GROUP_MEMBERS_LISTED = 10
+
+
+@dataclass
+class PodDiagnosis:
+    pod: PodRecord
+    events: list
+    container: str
+    log_excerpt: str
+    log_fingerprint: str
+    log_error: str = ""
+
+
+def log_fingerprint(log_filter: LogFilter, pod_name: str) -> str:
+    # Last warning-or-worse entry (or the last entry at all), reduced to its final line with ids removed
+    entries = [text for text, _, _ in log_filter.entries]
+    warning = SEVERITY_LEVELS.index("warning")
+    chosen = next((text for text in reversed(entries) if log_filter.block_level(text.split("\n")) >= warning),
+                  entries[-1] if entries else "")
+    last_line = chosen.strip().split("\n")[-1] if chosen else ""
+    return FINGERPRINT_PATTERN.sub("#", last_line.replace(pod_name, "<pod>")).strip()[:200]
+
+
+def failure_signature(diagnosis: PodDiagnosis) -> tuple:
+    containers = tuple(
+        (c.name, c.state, c.reason, c.exit_code, c.last_reason, c.last_exit_code)
+        for c in diagnosis.pod.failing_containers
+    )
+    return (diagnosis.pod.status, containers, diagnosis.log_fingerprint)
+
+
+def describe_signature(signature: tuple) -> str:
+    status, containers, fingerprint = signature
+    parts = [f"status={status}"]
+    for name, state, reason, exit_code, last_reason, last_exit_code in containers:
+        text = f"{name}: {state} {reason}".rstrip()
+        if exit_code is not None:
+            text += f" exit {exit_code}"
+        if last_reason or last_exit_code is not None:
+            text += f", last {last_reason or 'terminated'} exit {last_exit_code}"
+        parts.append(text)
+    if fingerprint:
+        parts.append(f"log: {fingerprint}")
+    return " | ".join(parts)
+
+
+def group_diagnoses(diagnoses: list) -> list:
+    # [(signature, [diagnosis, ...]), ...], largest group first
+    groups = defaultdict(list)
+    for diagnosis in diagnoses:
+        groups[failure_signature(diagnosis)].append(diagnosis)
+    return sorted(groups.items(), key=lambda item: len(item[1]), reverse=True)
+
+
+def render_groups(namespace: str, groups: list, total_pods: int) -> str:
+    unhealthy = sum(len(members) for _, members in groups)
+    if not unhealthy:
+        return f"All {total_pods} pods in namespace {namespace} are healthy."
+    lines = [f"{unhealthy} of {total_pods} pods in namespace {namespace} are unhealthy, in {len(groups)} failure group(s)."]
+    for i, (signature, members) in enumerate(groups, 1):
+        representative = members[0]
+        names = ", ".join(d.pod.name for d in members[:MAX_GROUP_MEMBERS_LISTED])
+        if len(members) > MAX_GROUP_MEMBERS_LISTED:
+            names += f", ... and {len(members) - MAX_GROUP_MEMBERS_LISTED} more"
+        lines.append("")
+        lines.append(f"Group {i}: {len(members)} pod(s) -- {describe_signature(signature)}")
+        lines.append(f"Pods: {names}")
+        lines.append(f"Representative: {representative.pod.name}")
+        lines.append(summarize_pod(representative.pod, representative.events))
+        lines.append(f"Logs ({representative.container}):")
+        lines.append(representative.log_error or representative.log_excerpt)
+    return "\n".join(lines)
@@ -0,0 +1,87 @@
+# File: pod-patrol/evidence.py
+
+import asyncio
+from dataclasses import dataclass
+from question_targets import extract_namespaces, extract_pod_names
+from tools import load_snapshot, run_tool, pods_summary, pod_summary, events_summary, cached_logs_summary
+from telemetry import tracer
+from constants import EVIDENCE_MAX_PODS, EVIDENCE_LOG_LINES, EVIDENCE_SECTION_CHARS
+
+"""
+One frozen bundle of cluster evidence per question, shared by every verifier of every candidate.
+collect_evidence fetches the pod summary, events, and the description and logs of the pods the question names
+(or the namespace's unhealthy pods) once, through the same cached tool paths the agents use. Verifiers then get
+their sections in the prompt and judge in a single tool-less call, instead of each fetching the same data again
+for every candidate. All candidates are judged against the same snapshot, even if the cluster changes meanwhile.
+"""
+
+# Separates the answer under review from the evidence in a verifier prompt
+EVIDENCE_HEADER = "Cluster evidence"
+SECTION_TITLES = {
+    "pods": "Pod status (K8s_Get_Pods)",
+    "describe": "Pod descriptions (K8s_Describe_Pod)",
+    "logs": "Pod logs (K8s_Get_Logs)",
+    "events": "Events (K8s_Get_Events)",
+}
+
+
+def truncate(text: str, limit: int = EVIDENCE_SECTION_CHARS) -> str:
+    return text if len(text) <= limit else text[:limit] + f"\n... ({len(text) - limit} more characters)"
+
+
+@dataclass(frozen=True)
+class EvidenceBundle():
+    namespace: str
+    pods: str
+    describe: str
+    logs: str
+    events: str
+
+    def prompt(self, answer: str, sections: tuple) -> str:
+        parts = [f"Suggestion to verify:\n{answer}", f"{EVIDENCE_HEADER} from namespace {self.namespace}:"]
+        for section in sections:
+            parts.append(f"## {SECTION_TITLES[section]}\n{getattr(self, section)}")
+        return "\n\n".join(parts)
+
+
+def log_target(pod) -> tuple:
+    # Same container choice as the batch diagnosis: the first failing one, from its previous run if it crashed
+    failing = pod.failing_containers or pod.containers
+    container = failing[0].name if failing else ""
+    previous = bool(failing) and failing[0].restart_count > 0 and failing[0].state != "running"
+    return container, previous
+
+async def pod_logs(pod, namespace: str) -> str:
+    container, previous = log_target(pod)
+    logs = await run_tool("get_logs", cached_logs_summary(pod.name, namespace, container, previous, EVIDENCE_LOG_LINES),
+                          namespace=namespace, pod=pod.name)
+    return f"{pod.name}/{container}" + (" (previous run)" if previous else "") + f":\n{logs}"
+
+async def collect_evidence(question: str) -> EvidenceBundle:
+    # Returns None if the cluster can't be read; verifiers then fall back to their tools
+    namespace = extract_namespaces(question)[0]
+    with tracer.span("evidence", namespace=namespace) as span:
+        try:
+            snapshot = await load_snapshot(namespace)
+        except Exception as e:
+            print(f"Could not collect verifier evidence: {e}. Verifiers will use their tools.")
+            span.set("error", f"{type(e).__name__}: {e}")
+            return None
+        named = [snapshot.get_pod(name, namespace) for name in extract_pod_names(question)]
+        targets = ([pod for pod in named if pod is not None] or snapshot.unhealthy_pods(namespace))[:EVIDENCE_MAX_PODS]
+        span.set("pods", len(targets))
+        pods, events, describes, logs = await asyncio.gather(
+            run_tool("get_pods", pods_summary(namespace), namespace=namespace),
+            run_tool("get_events", events_summary(namespace), namespace=namespace),
+            asyncio.gather(*[run_tool("describe_pod", pod_summary(pod.name, namespace), namespace=namespace,
+                                      pod=pod.name) for pod in targets]),
+            asyncio.gather(*[pod_logs(pod, namespace) for pod in targets]),
+        )
+    no_targets = f"No unhealthy pods in namespace {namespace}."
+    return EvidenceBundle(
+        namespace=namespace,
+        pods=truncate(pods),
+        describe=truncate("\n\n".join(describes) or no_targets),
+        logs=truncate("\n\n".join(logs) or no_targets),
+        events=truncate(events),
+    )
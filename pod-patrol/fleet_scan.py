@@ -0,0 +1,199 @@
+# File: pod-patrol/fleet_scan.py
+
+import asyncio
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from k8s_backend import create_backend, list_kube_contexts, RateLimiter
+from snapshot import ClusterSnapshot, PodRecord, pod_from_json, event_from_json, describe_container_state, container_label
+from telemetry import tracer
+from constants import (
+    K8S_BACKEND,
+    SCAN_MAX_CLUSTERS,
+    SCAN_CLUSTER_CONNECTIONS,
+    SCAN_CLUSTER_QPS,
+    SCAN_CLUSTER_BURST,
+    SCAN_MAX_LISTED,
+)
+
+"""
+Fleet-wide scan of many kube contexts and namespaces at once, for incidents that span clusters.
+Every cluster gets its own backend, with its own connection pool (SCAN_CLUSTER_CONNECTIONS) and token-bucket rate
+limit (SCAN_CLUSTER_QPS), so one slow or huge cluster neither starves the others nor gets flooded. Up to
+SCAN_MAX_CLUSTERS clusters are scanned at the same time, and all namespaces of a cluster concurrently; events are
+only fetched for namespaces that have unhealthy pods. Unhealthy pods are grouped into workloads by owner and
+merged into one list, most severe first, which the agent gets as its starting context.
+A cluster or namespace that can't be read is reported with the results instead of failing the scan.
+"""
+
+# How bad a pod status (or a container's last termination reason) is; anything else unhealthy counts as 2
+STATUS_SEVERITY = {
+    "OOMKilled": 5,
+    "CrashLoopBackOff": 5,
+    "Error": 4,
+    "CreateContainerConfigError": 4,
+    "CreateContainerError": 4,
+    "RunContainerError": 4,
+    "ImagePullBackOff": 3,
+    "ErrImagePull": 3,
+    "InvalidImageName": 3,
+    "ContainerCreating": 1,
+    "Terminating": 1,
+}
+DEFAULT_SEVERITY = 2
+ALL_CONTEXTS = "all"
+CURRENT_CONTEXT = "current context"
+
+
+def workload_name(pod: PodRecord) -> str:
+    # Pods of a Deployment are owned by a ReplicaSet named <deployment>-<pod-template-hash>
+    template_hash = pod.labels.get("pod-template-hash")
+    if pod.owner.startswith("ReplicaSet/") and template_hash and pod.owner.endswith(f"-{template_hash}"):
+        return "Deployment/" + pod.owner[len("ReplicaSet/"):-len(template_hash) - 1]
+    return pod.owner or f"Pod/{pod.name}"
+
+
+def pod_severity(pod: PodRecord) -> int:
+    # A pod stuck on an init container ("Init:CrashLoopBackOff") is as bad as one failing in its app containers
+    reasons = [pod.status.removeprefix("Init:")] + [c.last_reason for c in pod.failing_containers if c.last_reason]
+    return max(STATUS_SEVERITY.get(reason, DEFAULT_SEVERITY) for reason in reasons)
+
+
+@dataclass
+class WorkloadFinding():
+    cluster: str
+    namespace: str
+    workload: str
+    total_pods: int
+    unhealthy: list = field(default_factory=list)
+    warning_events: int = 0
+
+    @property
+    def severity(self) -> int:
+        return max(pod_severity(pod) for pod in self.unhealthy)
+
+    @property
+    def restarts(self) -> int:
+        return sum(pod.restart_count for pod in self.unhealthy)
+
+    def rank_key(self) -> tuple:
+        # Worst failure first, then workloads that are entirely down, then the most affected pods and restarts
+        return (self.severity, len(self.unhealthy) / self.total_pods, len(self.unhealthy), self.restarts,
+                self.warning_events)
+
+    def render(self) -> str:
+        statuses = Counter(pod.status for pod in self.unhealthy)
+        worst = max(self.unhealthy, key=lambda pod: (pod_severity(pod), pod.restart_count))
+        problems = "; ".join(f"{container_label(c)}: {describe_container_state(c)}" for c in worst.failing_containers)
+        return (f"[{self.cluster}] {self.namespace}/{self.workload}: {len(self.unhealthy)}/{self.total_pods} pods "
+                f"unhealthy (" + ", ".join(f"{status} x{count}" for status, count in statuses.most_common()) + "), "
+                f"{self.restarts} restarts, {self.warning_events} warning events; e.g. pod {worst.name}"
+                + (f" ({problems})" if problems else ""))
+
+
+@dataclass
+class FleetScan():
+    clusters: list
+    findings: list = field(default_factory=list)
+    errors: list = field(default_factory=list)  # (cluster, namespace, message)
+    pods_scanned: int = 0
+    seconds: float = 0.0
+
+    def render(self, limit: int = SCAN_MAX_LISTED) -> str:
+        lines = [f"Fleet scan of {len(self.clusters)} cluster(s) in {self.seconds:.1f}s: {self.pods_scanned} pods, "
+                 f"{len(self.findings)} unhealthy workload(s)" + (", most severe first:" if self.findings else ".")]
+        for i, finding in enumerate(self.findings[:limit], 1):
+            lines.append(f"{i}. {finding.render()}")
+        if len(self.findings) > limit:
+            lines.append(f"... and {len(self.findings) - limit} more unhealthy workloads")
+        if self.errors:
+            lines.append("Could not scan:")
+            for cluster, namespace, message in self.errors:
+                lines.append(f"- [{cluster}] {namespace or 'all namespaces'}: {message}")
+        return "\n".join(lines)
+
+
+def workload_findings(cluster: str, snapshot: ClusterSnapshot) -> list:
+    workloads = {}
+    for pod in snapshot.pods:
+        key = (pod.namespace, workload_name(pod))
+        if key not in workloads:
+            workloads[key] = WorkloadFinding(cluster, pod.namespace, key[1], 0)
+        finding = workloads[key]
+        finding.total_pods += 1
+        if not pod.healthy:
+            finding.unhealthy.append(pod)
+            finding.warning_events += sum(1 for event in snapshot.pod_events(pod) if event.type == "Warning")
+    return [finding for finding in workloads.values() if finding.unhealthy]
+
+
+def error_text(error: Exception) -> str:
+    return str(error) or type(error).__name__
+
+
+async def scan_cluster(context: str, namespaces: list, backend_kind: str, scan: FleetScan) -> list:
+    cluster = context or CURRENT_CONTEXT
+    with tracer.span("scan.cluster", cluster=cluster) as span:
+        try:
+            # Reading kubeconfig runs kubectl; keep it off the event loop
+            backend = await asyncio.to_thread(
+                create_backend, backend_kind, context, SCAN_CLUSTER_CONNECTIONS,
+                RateLimiter(SCAN_CLUSTER_QPS, SCAN_CLUSTER_BURST),
+            )
+        except Exception as e:
+            scan.errors.append((cluster, "", error_text(e)))
+            span.set("error", error_text(e))
+            return []
+        try:
+            # "" lists pods of all namespaces in one request
+            targets = namespaces or [""]
+            pod_lists = await asyncio.gather(*[backend.list_pods(namespace) for namespace in targets],
+                                             return_exceptions=True)
+            pods = []
+            for namespace, pod_list in zip(targets, pod_lists):
+                if isinstance(pod_list, Exception):
+                    scan.errors.append((cluster, namespace, error_text(pod_list)))
+                else:
+                    pods += [pod_from_json(item) for item in pod_list.get("items", [])]
+
+            failing = sorted({pod.namespace for pod in pods if not pod.healthy})
+            event_lists = await asyncio.gather(*[backend.list_events(namespace) for namespace in failing],
+                                               return_exceptions=True)
+            events = []
+            for namespace, event_list in zip(failing, event_lists):
+                # Without events the workloads are still ranked, just without their warning counts
+                if isinstance(event_list, Exception):
+                    scan.errors.append((cluster, namespace, f"events: {error_text(event_list)}"))
+                else:
+                    events += [event_from_json(item) for item in event_list.get("items", [])]
+        finally:
+            await backend.close()
+        scan.pods_scanned += len(pods)
+        findings = workload_findings(cluster, ClusterSnapshot(pods, events))
+        span.set("pods", len(pods))
+        span.set("unhealthy_workloads", len(findings))
+        return findings
+
+
+async def scan_fleet(contexts: list = None, namespaces: list = None, backend_kind: str = K8S_BACKEND) -> FleetScan:
+    # contexts: kubeconfig context names, ["all"] for every context in kubeconfig, or empty for the current one.
+    # namespaces: namespaces to scan in every cluster, or empty for all namespaces.
+    start = time.perf_counter()
+    with tracer.span("scan") as span:
+        contexts = list(contexts or [""])
+        if ALL_CONTEXTS in contexts:
+            contexts = await asyncio.to_thread(list_kube_contexts)
+        scan = FleetScan(clusters=[context or CURRENT_CONTEXT for context in contexts])
+        semaphore = asyncio.Semaphore(SCAN_MAX_CLUSTERS)
+
+        async def scan_one(context: str) -> list:
+            async with semaphore:
+                return await scan_cluster(context, list(namespaces or []), backend_kind, scan)
+
+        results = await asyncio.gather(*[scan_one(context) for context in contexts])
+        scan.findings = sorted((finding for findings in results for finding in findings),
+                               key=WorkloadFinding.rank_key, reverse=True)
+        scan.seconds = time.perf_counter() - start
+        span.set("clusters", len(contexts))
+        span.set("unhealthy_workloads", len(scan.findings))
+    return scan
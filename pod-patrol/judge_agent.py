@@ -1,9 +1,15 @@
 import asyncio
+import time
+from dataclasses import replace
 from agents import Agent, RunConfig, Runner, GuardrailFunctionOutput, RunContextWrapper, output_guardrail
-from agent_wrapper import AgentWrapper
-from tools import get_pods, describe_pod, get_logs, get_events
+from agent_wrapper import AgentWrapper, starter_run_config
+from tools import get_pods, describe_pod, get_logs, get_events, diagnose_unhealthy_pods
 from context_manager import ContextManager
-from constants import VERIFIER_MODEL
+from streaming import StreamPrinter
+from evidence import EvidenceBundle, collect_evidence
+from telemetry import tracer, record_usage, active_span
+from constants import (VERIFIER_MODEL, CANDIDATE_CONCURRENCY, VERIFIER_TIMEOUT, CANDIDATE_CHEAP_MODEL,
+                       ADAPTIVE_INITIAL_CANDIDATES, ADAPTIVE_SCORE_THRESHOLD, ADAPTIVE_LOW_SCORE)
 
 # -------------------------------
 # 0. Candidate Answer Agent
@@ -16,7 +22,7 @@ candidate_answer_agent = Agent(
     You are an agent who has kubernetes debugging tools at your disposal. You should use the tools to find the current system's context and debug kubernetes clusters that are failing.
     You should automatically try to analyze any pod that debug_kubernetes has a non-healthy status without asking for user input.
     """,
-    tools=[get_pods, describe_pod, get_logs, get_events],
+    tools=[get_pods, describe_pod, get_logs, get_events, diagnose_unhealthy_pods],
 )
 
 @output_guardrail
@@ -89,6 +95,39 @@ resource_event_verifier = Agent(
     tools=[get_events],
 )
 
+VERIFIERS = [
+    ("Pod Status Verifier", pod_status_verifier),
+    ("Configuration Verifier", config_verifier),
+    ("Log Analysis Verifier", log_analysis_verifier),
+    ("Resource/Event Verifier", resource_event_verifier),
+]
+
+# -------------------------------
+# 5. Evidence-based verifiers
+# -------------------------------
+def evidence_verifier(verifier: Agent, aspect: str) -> Agent:
+    # Tool-less copy of a verifier that judges from the shared evidence bundle in a single model call
+    return verifier.clone(
+        tools=[],
+        instructions=f"""
+    You are an aspect verifier for {aspect}.
+    The input is a Kubernetes debugging suggestion followed by cluster evidence that has already been collected for you; no tools are available.
+    Using only that evidence, determine if the suggestion addresses the issues the evidence shows.
+    Return only a '1' if it does, and '0' otherwise.
+    """,
+    )
+
+# (name, verifier, evidence sections it reads) -- the sections match the tool each verifier above uses
+EVIDENCE_VERIFIERS = [
+    ("Pod Status Verifier", evidence_verifier(pod_status_verifier, "Kubernetes pod status"), ("pods",)),
+    ("Configuration Verifier", evidence_verifier(config_verifier, "Kubernetes configuration best practices"),
+     ("describe",)),
+    ("Log Analysis Verifier", evidence_verifier(log_analysis_verifier, "Kubernetes log analysis"), ("logs",)),
+    ("Resource/Event Verifier", evidence_verifier(resource_event_verifier,
+                                                  "Kubernetes resource issues and event anomalies such as resource limits or OOM events"),
+     ("events", "pods")),
+]
+
 # -------------------------------
 # Main Pipeline
 # -------------------------------
@@ -97,44 +136,154 @@ o3_mini_run_config = RunConfig(
     model=VERIFIER_MODEL,
 )
 
-async def verify_candidates(question: str, candidate_num: int = 3, canonical_context: ContextManager = None) -> AgentWrapper:
-    # 1. Generate candidate answers
-    # 2. Verify each candidate answer
+async def verify_candidates(question: str, candidate_num: int = 3, canonical_context: ContextManager = None,
+                            max_concurrency: int = CANDIDATE_CONCURRENCY, early_exit: bool = False,
+                            verifier_timeout: float = VERIFIER_TIMEOUT, adaptive: bool = False,
+                            score_threshold: float = ADAPTIVE_SCORE_THRESHOLD, stream: bool = False,
+                            shared_evidence: bool = True, prefetch: bool = True) -> AgentWrapper:
+    # 1. Generate candidate answers concurrently (at most max_concurrency at a time)
+    # 2. Verify each candidate answer as soon as it is generated
     # 3. Aggregate scores
-    # 4. Return the best candidate
+    # 4. Return the best candidate (or the first perfect one if early_exit is set)
+    # In adaptive mode candidate_num is a budget: candidates are generated in rounds, starting with
+    # ADAPTIVE_INITIAL_CANDIDATES on CANDIDATE_CHEAP_MODEL, until one reaches score_threshold (see next_round).
+    # The winner's candidates_spent says how many candidates were started.
+    # With stream set, each candidate's tool calls and verifier votes are printed live, prefixed with its index.
+    # With shared_evidence, cluster evidence is collected once (alongside the first candidates) and every verifier
+    # judges from it without tools; otherwise each verifier fetches its own with its tool.
+    # prefetch is passed on to the candidates' AgentWrappers.
 
+    base_context = canonical_context or ContextManager()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
     hold_evaluations = {}
     hold_agents = {}
-    for i in range(candidate_num):
-        new_candidate = AgentWrapper(agent=candidate_answer_agent, context_manager=canonical_context)
-        await new_candidate.get_response(question)
-        await evaluate_using_verifiers(new_candidate)
-        hold_evaluations[i] = new_candidate.evaluated
+    evidence_task = asyncio.create_task(collect_evidence(question)) if shared_evidence else None
+
+    async def run_candidate(i: int, run_config: RunConfig):
+        with tracer.span("candidate", index=i, model=str(run_config.model)) as span:
+            printer = StreamPrinter(prefix=f"[candidate {i}] ", show_tokens=False) if stream else None
+            new_candidate = AgentWrapper(agent=candidate_answer_agent, run_config=run_config,
+                                         context_manager=base_context.fork(), stream=printer, prefetch=prefetch)
+            async with semaphore:
+                await new_candidate.get_response(question)
+            # Shielded: cancelling one candidate must not cancel the evidence the others are waiting on
+            evidence = await asyncio.shield(evidence_task) if evidence_task else None
+            await evaluate_using_verifiers(new_candidate, verifier_timeout, printer, evidence)
+            span.set("score", new_candidate.evaluated)
         print(f"Candidate {i} evaluated: {new_candidate.evaluated}")
-        hold_agents[i] = new_candidate
-
-    return hold_agents[max(hold_evaluations, key=hold_evaluations.get)]
-
-async def evaluate_using_verifiers(candidate: AgentWrapper):
-    pod_result = await Runner.run(pod_status_verifier, candidate.result.final_output, context=candidate.context_manager.get_context(), run_config=o3_mini_run_config)
-    config_result = await Runner.run(config_verifier, candidate.result.final_output, context=candidate.context_manager.get_context(), run_config=o3_mini_run_config)
-    log_result = await Runner.run(log_analysis_verifier, candidate.result.final_output, context=candidate.context_manager.get_context(), run_config=o3_mini_run_config)
-    resource_result = await Runner.run(resource_event_verifier, candidate.result.final_output, context=candidate.context_manager.get_context(), run_config=o3_mini_run_config)
-    # Iterate over each verifier result
-    total_vote = 0
-    denominator = 0
-    for name, result in [
-        ("Pod Status Verifier", pod_result),
-        ("Configuration Verifier", config_result),
-        ("Log Analysis Verifier", log_result),
-        ("Resource/Event Verifier", resource_result),
-    ]:
+        return i, new_candidate
+
+    async def run_round(indexes: range, run_config: RunConfig, threshold: float) -> bool:
+        # Returns whether a candidate reached the threshold (None = never stop early)
+        tasks = [asyncio.create_task(run_candidate(i, run_config)) for i in indexes]
         try:
-            vote = int(result.final_output.strip())
-            denominator += 1
-        except ValueError as e:
-            print(f"Tripwire from {name}: Invalid verifier output: {result.final_output} (error: {e}). Defaulting vote to 0.")
-            vote = 0
-        total_vote += vote
-
-    candidate.evaluated = total_vote / denominator
+            for finished in asyncio.as_completed(tasks):
+                i, new_candidate = await finished
+                hold_evaluations[i] = new_candidate.evaluated
+                hold_agents[i] = new_candidate
+                if threshold is not None and new_candidate.evaluated >= threshold:
+                    print(f"Candidate {i} reached a score of {new_candidate.evaluated}, skipping remaining candidates.")
+                    return True
+            return False
+        finally:
+            # Cancel whatever is still running (early exit or a failed candidate)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    try:
+        if not adaptive:
+            await run_round(range(candidate_num), starter_run_config, 1.0 if early_exit else None)
+            spent = candidate_num
+        else:
+            run_config = replace(starter_run_config, model=CANDIDATE_CHEAP_MODEL)
+            round_size = max(1, min(ADAPTIVE_INITIAL_CANDIDATES, candidate_num))
+            spent = 0
+            while True:
+                reached = await run_round(range(spent, spent + round_size), run_config, score_threshold)
+                spent += round_size
+                if reached or spent >= candidate_num:
+                    break
+                round_scores = [hold_evaluations[i] for i in range(spent - round_size, spent)]
+                run_config, round_size = next_round(run_config, round_size, round_scores, candidate_num - spent)
+            print(f"Adaptive validation spent {spent} of {candidate_num} candidates.")
+    finally:
+        if evidence_task:
+            evidence_task.cancel()
+            await asyncio.gather(evidence_task, return_exceptions=True)
+
+    # Ties go to the lowest candidate index, same as the serial version
+    winner = hold_agents[max(sorted(hold_evaluations), key=hold_evaluations.get)]
+    winner.candidates_spent = spent
+    active_span().set("candidates_spent", spent)
+    return winner
+
+def next_round(run_config: RunConfig, round_size: int, round_scores: list, remaining: int):
+    # Nobody reached the threshold. If every candidate scored low, the cheap model is likely missing the cause,
+    # so switch to the stronger model; otherwise (split or near-miss scores) sample twice as many candidates.
+    if run_config.model != starter_run_config.model and max(round_scores) < ADAPTIVE_LOW_SCORE:
+        print(f"Scores {round_scores} are low, escalating to {starter_run_config.model}.")
+        return starter_run_config, min(round_size, remaining)
+    round_size = min(round_size * 2, remaining)
+    print(f"Scores {round_scores} are split or low, adding {round_size} more candidates.")
+    return run_config, round_size
+
+async def run_verifier(name: str, verifier: Agent, answer: str, context: str, timeout: float):
+    # Returns (name, vote, latency). A timeout, error or invalid output is an abstention (vote None).
+    start = time.perf_counter()
+    vote = None
+    with tracer.span("verifier", verifier=name) as span:
+        try:
+            result = await asyncio.wait_for(
+                Runner.run(verifier, answer, context=context, run_config=o3_mini_run_config),
+                timeout=timeout,
+            )
+            record_usage(result)
+            try:
+                vote = int(result.final_output.strip())
+                if vote not in [0, 1]:
+                    raise ValueError(f"vote must be 0 or 1, got {vote}")
+            except ValueError as e:
+                print(f"Tripwire from {name}: Invalid verifier output: {result.final_output} (error: {e}). Counting as abstention.")
+                vote = None
+        except asyncio.TimeoutError:
+            print(f"{name} timed out after {timeout}s. Counting as abstention.")
+            span.set("timed_out", True)
+        except Exception as e:
+            print(f"{name} failed: {e}. Counting as abstention.")
+            span.set("error", f"{type(e).__name__}: {e}")
+        span.set("vote", "abstain" if vote is None else vote)
+    return name, vote, time.perf_counter() - start
+
+async def evaluate_using_verifiers(candidate: AgentWrapper, timeout: float = VERIFIER_TIMEOUT,
+                                   printer: StreamPrinter = None, evidence: EvidenceBundle = None):
+    answer = candidate.result.final_output
+    context = candidate.context_manager.get_context()
+    if evidence is None:
+        jobs = [(name, verifier, answer) for name, verifier in VERIFIERS]
+    else:
+        jobs = [(name, verifier, evidence.prompt(answer, sections)) for name, verifier, sections in EVIDENCE_VERIFIERS]
+    tasks = [asyncio.create_task(run_verifier(name, verifier, verifier_input, context, timeout))
+             for name, verifier, verifier_input in jobs]
+    results = []
+    try:
+        for finished in asyncio.as_completed(tasks):
+            results.append(await finished)
+            if printer:
+                name, vote, _ = results[-1]
+                printer.vote(name, vote, [vote for _, vote, _ in results])
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    # Report in VERIFIERS order regardless of which finished first
+    order = [name for name, _ in VERIFIERS]
+    results.sort(key=lambda result: order.index(result[0]))
+
+    candidate.verifier_votes = {name: vote for name, vote, _ in results}
+    candidate.verifier_latencies = {name: latency for name, _, latency in results}
+    print("Verifier latencies: " + ", ".join(f"{name} {latency:.2f}s" for name, _, latency in results))
+
+    # Abstentions are left out of the denominator
+    votes = [vote for vote in candidate.verifier_votes.values() if vote is not None]
+    candidate.evaluated = sum(votes) / len(votes) if votes else 0.0
@@ -0,0 +1,454 @@
+# File: pod-patrol/k8s_backend.py
+
+import asyncio
+import base64
+import json
+import os
+import re
+import ssl
+import subprocess
+import tempfile
+import time
+from urllib.parse import quote
+import httpx
+from telemetry import tracer
+from constants import (
+    K8S_BACKEND,
+    K8S_API_SERVER_ENV,
+    K8S_API_TOKEN_ENV,
+    K8S_REQUEST_TIMEOUT,
+    K8S_MAX_CONNECTIONS,
+    KUBECTL_MAX_PROCESSES,
+    LOG_LIMIT_BYTES,
+    WATCH_TIMEOUT_SECONDS,
+)
+
+"""
+Backends the kubectl tools run against.
+KubectlBackend runs kubectl as an asyncio subprocess for every call (kept as a fallback); the child is
+killed if the call times out or the awaiting task is cancelled, so a slow command never blocks the event loop.
+ApiBackend talks to the Kubernetes API server directly through one pooled httpx.AsyncClient,
+so kubeconfig is read once and TLS connections are reused across calls.
+Point ApiBackend at any base URL (kubectl proxy, a local fake API server) to test it without a cluster.
+Either backend can target a named kubeconfig context and take a RateLimiter, so a fleet scan can give every
+cluster its own connection pool and request rate.
+"""
+
+SERVICE_ACCOUNT_DIR = "/var/run/secrets/kubernetes.io/serviceaccount"
+
+
+class KubernetesBackendError(Exception):
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# DNS-1123 subdomain, the form namespace, pod and container names take. The names come from the model, so
+# anything else ("../secrets/x", "--kubeconfig=...") is refused before it reaches a URL path or kubectl's argv.
+OBJECT_NAME = re.compile(r"[a-z0-9]([-a-z0-9]*[a-z0-9])?(\.[a-z0-9]([-a-z0-9]*[a-z0-9])?)*")
+
+def checked_name(name: str, kind: str) -> str:
+    # Returns the name percent-encoded for use as one URL path segment
+    if len(name) > 253 or not OBJECT_NAME.fullmatch(name):
+        raise KubernetesBackendError(f"invalid {kind} name: {name!r}", 400)
+    return quote(name, safe="")
+
+
+class RateLimiter():
+    # Token bucket: `rate` requests per second on average, with bursts of up to `burst` requests
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Waiters queue on the lock, so requests are released in the order they arrived
+        async with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.tokens = 1
+                self.updated = time.monotonic()
+            self.tokens -= 1
+
+
+class KubernetesBackend():
+    # list_pods / get_pod / list_events return the API's JSON objects (see snapshot.py for parsing)
+    name = "base"
+    # Whether watch_pods can resume from a resourceVersion; if not, watchers relist after every reconnect
+    supports_watch_resume = False
+    # Optional RateLimiter every request waits on (long-lived watches are exempt)
+    rate_limiter = None
+
+    async def throttle(self):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+
+    async def list_pods(self, namespace: str) -> dict:
+        raise NotImplementedError
+
+    async def get_pod(self, pod_name: str, namespace: str) -> dict:
+        raise NotImplementedError
+
+    async def list_events(self, namespace: str) -> dict:
+        raise NotImplementedError
+
+    def stream_logs(self, pod_name: str, namespace: str, container: str = "", previous: bool = False,
+                    tail_lines: int = 0, since_seconds: int = 0):
+        # Async iterator over log lines; tail/since/container/previous are applied server-side
+        raise NotImplementedError
+
+    def watch_pods(self, namespace: str, resource_version: str = ""):
+        # Async iterator over watch events: {"type": ADDED/MODIFIED/DELETED/BOOKMARK/ERROR, "object": {...}}.
+        # An empty namespace watches all namespaces.
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+# -------------------------------
+# kubectl fallback
+# -------------------------------
+class KubectlBackend(KubernetesBackend):
+    name = "kubectl"
+
+    def __init__(self, timeout: float = K8S_REQUEST_TIMEOUT, max_processes: int = KUBECTL_MAX_PROCESSES,
+                 context: str = "", rate_limiter: RateLimiter = None):
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max_processes)
+        # kubeconfig context to run against ("" = the current one)
+        self.context_args = ["--context", context] if context else []
+        self.rate_limiter = rate_limiter
+
+    async def run(self, *args: str) -> str:
+        args = (*self.context_args, *args)
+        await self.throttle()
+        async with self.semaphore:
+            with tracer.span("kubectl", command=" ".join(args)) as span:
+                process = await asyncio.create_subprocess_exec(
+                    "kubectl", *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+                )
+                try:
+                    stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    raise KubernetesBackendError(f"kubectl {' '.join(args)} timed out after {self.timeout}s")
+                finally:
+                    # Reached on timeout and on cancellation: don't leave kubectl running
+                    if process.returncode is None:
+                        process.kill()
+                        await process.wait()
+                span.set("returncode", process.returncode)
+        if process.returncode != 0:
+            raise KubernetesBackendError(stderr.decode(errors="replace").strip())
+        return stdout.decode(errors="replace").strip()
+
+    async def run_json(self, *args: str) -> dict:
+        return json.loads(await self.run(*args, "-o", "json"))
+
+    async def list_pods(self, namespace: str) -> dict:
+        return await self.run_json("get", "pods", *namespace_args(namespace))
+
+    async def get_pod(self, pod_name: str, namespace: str) -> dict:
+        return await self.run_json("get", "pod", checked_name(pod_name, "pod"), "-n", checked_name(namespace, "namespace"))
+
+    async def list_events(self, namespace: str) -> dict:
+        return await self.run_json("get", "events", "-n", checked_name(namespace, "namespace"))
+
+    async def stream_logs(self, pod_name: str, namespace: str, container: str = "", previous: bool = False,
+                          tail_lines: int = 0, since_seconds: int = 0):
+        args = [*self.context_args, "logs", checked_name(pod_name, "pod"), "-n", checked_name(namespace, "namespace"),
+                f"--limit-bytes={LOG_LIMIT_BYTES}"]
+        if container:
+            args += ["-c", checked_name(container, "container")]
+        if previous:
+            args.append("--previous")
+        if tail_lines:
+            args.append(f"--tail={tail_lines}")
+        if since_seconds:
+            args.append(f"--since={since_seconds}s")
+        await self.throttle()
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        async with self.semaphore:
+            with tracer.span("kubectl", activate=False, command=" ".join(args)) as span:
+                process = await asyncio.create_subprocess_exec(
+                    "kubectl", *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, limit=1024 * 1024,
+                )
+                try:
+                    while True:
+                        remaining = deadline - asyncio.get_running_loop().time()
+                        line = await asyncio.wait_for(process.stdout.readline(), timeout=max(remaining, 0))
+                        if not line:
+                            break
+                        span.add("lines")
+                        yield line.decode(errors="replace")
+                    stderr = await process.stderr.read()
+                    await process.wait()
+                except asyncio.TimeoutError:
+                    raise KubernetesBackendError(f"kubectl {' '.join(args)} timed out after {self.timeout}s")
+                finally:
+                    if process.returncode is None:
+                        process.kill()
+                        await process.wait()
+                span.set("returncode", process.returncode)
+        if process.returncode != 0:
+            raise KubernetesBackendError(stderr.decode(errors="replace").strip())
+
+    async def watch_pods(self, namespace: str, resource_version: str = ""):
+        # kubectl can't resume from a resourceVersion, so resource_version is ignored here.
+        # Watch processes run outside the semaphore: they are long-lived and would starve the tools.
+        process = await asyncio.create_subprocess_exec(
+            "kubectl", *self.context_args, "get", "pods", *namespace_args(namespace), "--watch-only", "--output-watch-events", "-o", "json",
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        # kubectl prints one pretty-printed JSON object per event
+        decoder = json.JSONDecoder()
+        buffer = ""
+        try:
+            while True:
+                chunk = await process.stdout.read(65536)
+                if not chunk:
+                    break
+                buffer += chunk.decode(errors="replace")
+                while True:
+                    buffer = buffer.lstrip()
+                    try:
+                        event, end = decoder.raw_decode(buffer)
+                    except ValueError:
+                        break
+                    buffer = buffer[end:]
+                    yield event
+            stderr = await process.stderr.read()
+            await process.wait()
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+        if process.returncode != 0:
+            raise KubernetesBackendError(stderr.decode(errors="replace").strip())
+
+
+def namespace_args(namespace: str) -> list:
+    return ["-n", checked_name(namespace, "namespace")] if namespace else ["--all-namespaces"]
+
+
+# -------------------------------
+# In-process API client
+# -------------------------------
+class ApiBackend(KubernetesBackend):
+    name = "api"
+    supports_watch_resume = True
+
+    def __init__(self, server: str, token: str = None, verify=True, cert_files: tuple = None,
+                 max_connections: int = K8S_MAX_CONNECTIONS, timeout: float = K8S_REQUEST_TIMEOUT,
+                 rate_limiter: RateLimiter = None):
+        headers = {"Accept": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        if cert_files and isinstance(verify, ssl.SSLContext):
+            verify.load_cert_chain(*cert_files)
+        self.server = server.rstrip("/")
+        self.rate_limiter = rate_limiter
+        self.client = httpx.AsyncClient(
+            base_url=self.server,
+            headers=headers,
+            verify=verify,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def request(self, path: str, params: dict = None, as_json: bool = True):
+        await self.throttle()
+        with tracer.span("k8s_api", path=path) as span:
+            try:
+                response = await self.client.get(path, params=params)
+            except httpx.HTTPError as e:
+                raise KubernetesBackendError(f"{type(e).__name__}: {e}") from e
+            span.set("status_code", response.status_code)
+        if response.status_code != 200:
+            raise KubernetesBackendError(error_message(response), response.status_code)
+        return response.json() if as_json else response.text
+
+    async def list_pods(self, namespace: str) -> dict:
+        return await self.request(pods_path(namespace))
+
+    async def get_pod(self, pod_name: str, namespace: str) -> dict:
+        return await self.request(pod_path(pod_name, namespace))
+
+    async def list_events(self, namespace: str) -> dict:
+        return await self.request(f"/api/v1/namespaces/{checked_name(namespace, 'namespace')}/events")
+
+    async def stream_logs(self, pod_name: str, namespace: str, container: str = "", previous: bool = False,
+                          tail_lines: int = 0, since_seconds: int = 0):
+        path = f"{pod_path(pod_name, namespace)}/log"
+        params = {"limitBytes": LOG_LIMIT_BYTES}
+        if container:
+            params["container"] = checked_name(container, "container")
+        if previous:
+            params["previous"] = "true"
+        if tail_lines:
+            params["tailLines"] = tail_lines
+        if since_seconds:
+            params["sinceSeconds"] = since_seconds
+        await self.throttle()
+        with tracer.span("k8s_api", activate=False, path=path) as span:
+            try:
+                async with self.client.stream("GET", path, params=params) as response:
+                    span.set("status_code", response.status_code)
+                    if response.status_code != 200:
+                        await response.aread()
+                        raise KubernetesBackendError(error_message(response), response.status_code)
+                    async for line in response.aiter_lines():
+                        span.add("lines")
+                        yield line
+            except httpx.HTTPError as e:
+                raise KubernetesBackendError(f"{type(e).__name__}: {e}") from e
+
+    async def watch_pods(self, namespace: str, resource_version: str = ""):
+        params = {"watch": "true", "allowWatchBookmarks": "true", "timeoutSeconds": WATCH_TIMEOUT_SECONDS}
+        if resource_version:
+            params["resourceVersion"] = resource_version
+        path = pods_path(namespace)
+        # The server ends the watch after timeoutSeconds; only then may a read take that long
+        timeout = httpx.Timeout(K8S_REQUEST_TIMEOUT, read=WATCH_TIMEOUT_SECONDS + K8S_REQUEST_TIMEOUT)
+        try:
+            async with self.client.stream("GET", path, params=params, timeout=timeout) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise KubernetesBackendError(error_message(response), response.status_code)
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        yield json.loads(line)
+        except httpx.HTTPError as e:
+            raise KubernetesBackendError(f"{type(e).__name__}: {e}") from e
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def pods_path(namespace: str) -> str:
+    # An empty namespace lists all namespaces
+    return f"/api/v1/namespaces/{checked_name(namespace, 'namespace')}/pods" if namespace else "/api/v1/pods"
+
+def pod_path(pod_name: str, namespace: str) -> str:
+    return f"/api/v1/namespaces/{checked_name(namespace, 'namespace')}/pods/{checked_name(pod_name, 'pod')}"
+
+
+def error_message(response: httpx.Response) -> str:
+    try:
+        message = response.json().get("message", response.text)
+    except ValueError:
+        message = response.text
+    return f"{response.status_code} {message}".strip()
+
+
+def load_api_settings(context: str = ""):
+    # Returns ApiBackend kwargs, or None if no usable credentials were found.
+    # Order: explicit env override, in-cluster service account, current kubeconfig context.
+    # A named context is always read from kubeconfig.
+    if context:
+        return load_kubeconfig_settings(context)
+    server = os.environ.get(K8S_API_SERVER_ENV)
+    if server:
+        return {"server": server, "token": os.environ.get(K8S_API_TOKEN_ENV)}
+
+    host, port = os.environ.get("KUBERNETES_SERVICE_HOST"), os.environ.get("KUBERNETES_SERVICE_PORT")
+    token_path = os.path.join(SERVICE_ACCOUNT_DIR, "token")
+    if host and port and os.path.exists(token_path):
+        with open(token_path) as f:
+            token = f.read().strip()
+        verify = ssl.create_default_context(cafile=os.path.join(SERVICE_ACCOUNT_DIR, "ca.crt"))
+        return {"server": f"https://{host}:{port}", "token": token, "verify": verify}
+
+    return load_kubeconfig_settings()
+
+
+def load_kubeconfig_settings(context: str = ""):
+    # kubectl resolves the context for us; this runs once per backend, not per tool call.
+    command = ["kubectl", "config", "view", "--raw", "--minify", "-o", "json"]
+    if context:
+        command += ["--context", context]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=K8S_REQUEST_TIMEOUT)
+        if result.returncode != 0:
+            return None
+        config = json.loads(result.stdout)
+        cluster = config["clusters"][0]["cluster"]
+        user = config["users"][0].get("user", {}) if config.get("users") else {}
+    except Exception:
+        return None
+    if "exec" in user or "auth-provider" in user:
+        # Plugin-based auth (EKS, GKE, ...) is left to kubectl
+        return None
+
+    if cluster.get("insecure-skip-tls-verify"):
+        verify = ssl.create_default_context()
+        verify.check_hostname = False
+        verify.verify_mode = ssl.CERT_NONE
+    elif cluster.get("certificate-authority-data"):
+        verify = ssl.create_default_context(cadata=base64.b64decode(cluster["certificate-authority-data"]).decode())
+    elif cluster.get("certificate-authority"):
+        verify = ssl.create_default_context(cafile=cluster["certificate-authority"])
+    else:
+        verify = ssl.create_default_context()
+
+    settings = {"server": cluster["server"], "token": user.get("token"), "verify": verify}
+    if user.get("client-certificate-data") and user.get("client-key-data"):
+        # ssl only loads client certs from files; they are read into memory and removed right away
+        cert_files = []
+        for field in ["client-certificate-data", "client-key-data"]:
+            with tempfile.NamedTemporaryFile("wb", delete=False) as f:
+                f.write(base64.b64decode(user[field]))
+                cert_files.append(f.name)
+        try:
+            verify.load_cert_chain(*cert_files)
+        finally:
+            for path in cert_files:
+                os.remove(path)
+    elif user.get("client-certificate") and user.get("client-key"):
+        settings["cert_files"] = (user["client-certificate"], user["client-key"])
+    return settings
+
+
+def list_kube_contexts() -> list:
+    result = subprocess.run(["kubectl", "config", "get-contexts", "-o", "name"], capture_output=True, text=True,
+                            timeout=K8S_REQUEST_TIMEOUT)
+    if result.returncode != 0:
+        raise KubernetesBackendError(result.stderr.strip())
+    return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+
+
+def create_backend(kind: str = K8S_BACKEND, context: str = "", max_connections: int = K8S_MAX_CONNECTIONS,
+                   rate_limiter: RateLimiter = None) -> KubernetesBackend:
+    # context: kubeconfig context to talk to ("" = the current one, or the env override / in-cluster account)
+    kubectl_options = {"max_processes": min(max_connections, KUBECTL_MAX_PROCESSES), "context": context,
+                       "rate_limiter": rate_limiter}
+    if kind == "kubectl":
+        return KubectlBackend(**kubectl_options)
+    settings = load_api_settings(context)
+    if settings is None:
+        target = f"context {context}" if context else "the API server"
+        if kind == "api":
+            raise KubernetesBackendError(f"No credentials found for {target} for the 'api' backend")
+        print(f"No credentials found for {target}, falling back to kubectl")
+        return KubectlBackend(**kubectl_options)
+    return ApiBackend(**settings, max_connections=max_connections, rate_limiter=rate_limiter)
+
+
+_backend = None
+
+
+def get_backend() -> KubernetesBackend:
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+
+def set_backend(backend: KubernetesBackend):
+    global _backend
+    _backend = backend
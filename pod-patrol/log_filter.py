@@ -0,0 +1,124 @@
+# File: pod-patrol/log_filter.py
+
+import re
+from collections import deque
+from constants import LOG_MAX_OUTPUT_CHARS
+
+"""
+Incremental log filter used while a log stream is being read.
+Lines are grouped into entries (a single line, or a multi-line stack trace), filtered by regex and/or
+minimum severity, and deduplicated: repeated stack traces are kept once with a repeat count, and runs of
+identical lines are collapsed. Only the most recent LOG_MAX_OUTPUT_CHARS of matches are kept in memory.
+"""
+
+SEVERITY_LEVELS = ["debug", "info", "warning", "error", "critical"]
+SEVERITY_PATTERN = re.compile(r"\b(DEBUG|TRACE|INFO|WARN(?:ING)?|ERR(?:OR)?|FATAL|CRIT(?:ICAL)?|PANIC)\b", re.IGNORECASE)
+SEVERITY_ALIASES = {
+    "trace": "debug", "warn": "warning", "err": "error", "fatal": "critical", "crit": "critical", "panic": "critical",
+}
+# Lines that continue the previous entry (indented frames, Java "at ...", "Caused by:", "... 12 more")
+CONTINUATION_PATTERN = re.compile(r"^(\s+\S|\s*at\s|Caused by:|\.\.\. \d+ more)")
+TRACEBACK_PATTERN = re.compile(r"Traceback \(most recent call last\)|\b\w*(Exception|Error)\b")
+# Digits and hex ids (timestamps, line numbers, addresses) are ignored when comparing stack traces
+FINGERPRINT_PATTERN = re.compile(r"0x[0-9a-fA-F]+|\d+")
+
+
+def severity_level(name: str) -> int:
+    name = name.lower()
+    return SEVERITY_LEVELS.index(SEVERITY_ALIASES.get(name, name))
+
+
+class LogFilter():
+    def __init__(self, pattern: str = "", min_severity: str = "", max_chars: int = LOG_MAX_OUTPUT_CHARS):
+        try:
+            self.regex = re.compile(pattern) if pattern else None
+        except re.error as e:
+            raise ValueError(f"Invalid log pattern {pattern!r}: {e}")
+        if min_severity and min_severity.lower() not in SEVERITY_LEVELS + list(SEVERITY_ALIASES):
+            raise ValueError(f"Unknown severity {min_severity!r}, expected one of {', '.join(SEVERITY_LEVELS)}")
+        self.min_level = severity_level(min_severity) if min_severity else None
+        self.max_chars = max_chars
+        self.block = []
+        self.in_python_traceback = False
+        # Each entry is [text, repeat_count, fingerprint]
+        self.entries = deque()
+        self.entry_chars = 0
+        self.traces = {}
+        self.lines_read = 0
+        self.dropped_entries = 0
+
+    def feed(self, line: str):
+        line = line.rstrip("\r\n")
+        self.lines_read += 1
+        if self.block and CONTINUATION_PATTERN.match(line):
+            self.block.append(line)
+            return
+        if self.block and self.in_python_traceback:
+            # "ValueError: ..." closes a Python traceback
+            self.block.append(line)
+            self.in_python_traceback = False
+            self.flush()
+            return
+        self.flush()
+        self.block = [line]
+        self.in_python_traceback = "Traceback (most recent call last)" in line
+
+    def block_level(self, block: list) -> int:
+        levels = [severity_level(match.group(1)) for line in block for match in [SEVERITY_PATTERN.search(line)] if match]
+        if len(block) > 1 and TRACEBACK_PATTERN.search("\n".join(block)):
+            levels.append(SEVERITY_LEVELS.index("error"))
+        # Lines without a recognizable level count as info
+        return max(levels) if levels else SEVERITY_LEVELS.index("info")
+
+    def flush(self):
+        if not self.block:
+            return
+        block, self.block = self.block, []
+        if self.min_level is not None and self.block_level(block) < self.min_level:
+            return
+        text = "\n".join(block)
+        if self.regex and not self.regex.search(text):
+            return
+
+        fingerprint = FINGERPRINT_PATTERN.sub("#", text) if len(block) > 1 else None
+        if fingerprint is not None and fingerprint in self.traces:
+            self.traces[fingerprint][1] += 1
+            return
+        if fingerprint is None and self.entries and self.entries[-1][0] == text:
+            self.entries[-1][1] += 1
+            return
+
+        entry = [text, 0, fingerprint]
+        self.entries.append(entry)
+        self.entry_chars += len(text) + 1
+        if fingerprint is not None:
+            self.traces[fingerprint] = entry
+        # Keep the most recent matches within the output budget
+        while self.entry_chars > self.max_chars and len(self.entries) > 1:
+            dropped = self.entries.popleft()
+            self.entry_chars -= len(dropped[0]) + 1
+            self.dropped_entries += 1
+            if dropped[2] is not None:
+                del self.traces[dropped[2]]
+
+    def finish(self) -> str:
+        self.flush()
+        filters = []
+        if self.regex:
+            filters.append(f"pattern={self.regex.pattern!r}")
+        if self.min_level is not None:
+            filters.append(f"min_severity={SEVERITY_LEVELS[self.min_level]}")
+        header = f"Read {self.lines_read} log lines, {len(self.entries)} entries shown"
+        if filters:
+            header += f" (filters: {', '.join(filters)})"
+        if self.dropped_entries:
+            header += f", {self.dropped_entries} older entries omitted"
+        lines = [header + ":"]
+        for text, repeats, fingerprint in self.entries:
+            if repeats:
+                kind = "stack trace" if fingerprint is not None else "line"
+                text += f"\n[{kind} repeated {repeats} more time{'s' if repeats != 1 else ''}]"
+            lines.append(text)
+        if not self.entries:
+            lines.append("<no matching log lines>")
+        return "\n".join(lines)
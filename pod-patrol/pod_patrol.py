@@ -4,35 +4,78 @@ from tap import Tap
 from agent_wrapper import AgentWrapper
 from context_manager import ContextManager
 import asyncio
-from judge_agent import verify_candidates, candidate_answer_agent
+from judge_agent import candidate_answer_agent
+from k8s_backend import create_backend, get_backend, set_backend
+from pod_watcher import PodWatcher
+from fleet_scan import scan_fleet
+from answer_cache import AnswerCache
+from service import answer_question, DiagnosisService
+from streaming import StreamPrinter
+from telemetry import tracer
+from constants import CANDIDATE_CONCURRENCY, VERIFIER_TIMEOUT, K8S_BACKEND, SERVICE_MAX_CONCURRENCY, ADAPTIVE_SCORE_THRESHOLD
 
 class PodPatrolInputs(Tap):
     question: str = ""
     validate_solution: bool = False
     candidate_num: int = 3
+    candidate_concurrency: int = CANDIDATE_CONCURRENCY  # Max candidates generated at the same time
+    early_exit: bool = False  # Stop validating once a candidate gets a perfect score
+    verifier_timeout: float = VERIFIER_TIMEOUT  # Seconds before a verifier counts as abstaining
+    adaptive: bool = False  # Treat candidate_num as a budget: start with one cheap candidate and add more (or a stronger model) only while scores are low or split
+    score_threshold: float = ADAPTIVE_SCORE_THRESHOLD  # Verifier score that ends adaptive validation
+    verifier_tools: bool = False  # Let every verifier fetch its own evidence with tools instead of sharing one evidence bundle per question
+    backend: str = K8S_BACKEND  # Cluster backend for the tools: auto, api or kubectl
+    watch: bool = False  # Keep pod/container statuses current in the background from watch events
+    watch_namespace: str = "default"  # Namespace to watch ("" for all namespaces)
+    scan: bool = False  # Scan the --scan_contexts clusters and --scan_namespaces namespaces in parallel first, and give the agent the ranked unhealthy workloads as starting context
+    scan_contexts: list[str] = []  # Kubeconfig contexts to scan ("all" for every context; default: the current one)
+    scan_namespaces: list[str] = []  # Namespaces to scan in each cluster (default: all namespaces)
+    stream: bool = False  # Print the answer and tool calls as they arrive (in validation mode: each candidate's progress and verifier votes)
+    no_routing: bool = False  # Send every question to the reasoning model instead of answering lookups directly and simple questions with the cheap model
+    no_rules: bool = False  # Always ask the model, even for failures the signature rules recognize (missing config key, OOM kill, image pull, crash loop)
+    no_prefetch: bool = False  # Don't fetch the pods, events and logs a question points at while the model's first turn runs
+    no_answer_cache: bool = False  # Always run the agents, even for a repeated question on unchanged cluster state
+    trace_file: str = ""  # Write the run's spans to this file as OTLP/JSON
+    serve: str = ""  # Answer requests over HTTP instead of prompting: host:port, or unix:/path for a Unix socket
+    batch_file: str = ""  # Answer every question in this file (one per line, or JSON requests) instead of prompting
+    batch_output: str = "results.jsonl"  # JSONL file the batch results are written to
+    max_requests: int = SERVICE_MAX_CONCURRENCY  # Requests answered at once in server and batch mode
 
 async def main():
     inputs = PodPatrolInputs().parse_args()
-    starting_agent = AgentWrapper(candidate_answer_agent)
+    set_backend(create_backend(inputs.backend))
+    print(f"Using {get_backend().name} backend")
     canonical_context = ContextManager()
-    while (1):
+    if inputs.scan:
+        report = (await scan_fleet(inputs.scan_contexts, inputs.scan_namespaces, inputs.backend)).render()
+        print(report)
+        canonical_context.set_background(report)
+    answer_cache = None if inputs.no_answer_cache else AnswerCache()
+    starting_agent = AgentWrapper(candidate_answer_agent, context_manager=canonical_context, answer_cache=answer_cache,
+                                  stream=StreamPrinter() if inputs.stream else None, prefetch=not inputs.no_prefetch)
+    watcher = PodWatcher(canonical_context, inputs.watch_namespace).start() if inputs.watch else None
+    service = DiagnosisService(inputs, canonical_context, answer_cache, inputs.max_requests)
+    if inputs.batch_file:
+        await service.run_batch(inputs.batch_file, inputs.batch_output)
+    elif inputs.serve:
+        await service.serve(inputs.serve)
+    while not (inputs.batch_file or inputs.serve):
         if inputs.question == "":
-            inputs.question = input("\n> ")
+            inputs.question = await asyncio.to_thread(input, "\n> ")
         else:
             print("You inputted question:\n" + "> " + inputs.question)
 
         # Grab Response here:
         if inputs.question == "quit":
             break
-        if inputs.validate_solution:
-            print("Validating solution...")
-            canonical_agent = await verify_candidates(inputs.question, inputs.candidate_num, canonical_context)
-            # Update canonical context
-            canonical_context = canonical_agent.context_manager
-            print("\n\n" + canonical_agent.result.final_output)
-        else:
-            response = await starting_agent.get_response(inputs.question)
-            print(response)
+        with tracer.span("question", validated=inputs.validate_solution) as span:
+            answer, canonical_context = await answer_question(inputs, inputs.question, canonical_context,
+                                                              starting_agent, answer_cache)
+        if watcher:
+            watcher.context_manager = canonical_context
+        # A streamed answer is already on screen
+        if not span.attributes.get("streamed_answers"):
+            print(("\n\n" if inputs.validate_solution else "") + answer)
 
         """
         Ideal Flow:
@@ -50,6 +93,13 @@ async def main():
 
         inputs.question = ""
     
+    if watcher:
+        await watcher.stop()
+    await get_backend().close()
+    print("\n" + tracer.summary_table())
+    if inputs.trace_file:
+        tracer.export(inputs.trace_file)
+        print(f"Trace written to {inputs.trace_file}")
     print("Exiting...")
 
 
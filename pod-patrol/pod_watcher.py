@@ -0,0 +1,133 @@
+# File: pod-patrol/pod_watcher.py
+
+import asyncio
+from context_manager import ContextManager
+from k8s_backend import get_backend, KubernetesBackendError
+from snapshot import pod_from_json, describe_container_state
+from constants import WATCH_BACKOFF_INITIAL, WATCH_BACKOFF_MAX
+
+"""
+Background watcher that keeps ContextManager.containers current from pod watch events.
+It lists pods once, then applies ADDED/MODIFIED/DELETED events and resumes from the last seen
+resourceVersion after a disconnect (relisting when the version has expired or the source can't resume).
+Errors back off exponentially. The event source is anything with list_pods(namespace) and
+watch_pods(namespace, resource_version) -- a KubernetesBackend, or a local fake for tests.
+While a watcher is warm, tools read its pod list (warm_pod_list) instead of issuing a new list call. Any watch
+error makes it cold until a relist succeeds or the resumed watch delivers an event (bookmarks included), so a
+watch that keeps failing never serves a frozen pod list.
+"""
+
+active_watchers = []
+
+
+class WatchExpired(Exception):
+    pass
+
+
+def container_key(pod: dict, container_name: str) -> str:
+    metadata = pod.get("metadata", {})
+    return f"{metadata.get('namespace')}/{metadata.get('name')}/{container_name}"
+
+
+class PodWatcher():
+    def __init__(self, context_manager: ContextManager, namespace: str = "default", source=None,
+                 backoff_initial: float = WATCH_BACKOFF_INITIAL, backoff_max: float = WATCH_BACKOFF_MAX):
+        self.context_manager = context_manager
+        self.namespace = namespace
+        self.source = source
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.resource_version = ""
+        self.pods = {}  # (namespace, name) -> pod JSON
+        self.warm = False
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+        active_watchers.append(self)
+        return self
+
+    async def stop(self):
+        if self in active_watchers:
+            active_watchers.remove(self)
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    async def run(self):
+        source = self.source or get_backend()
+        backoff = self.backoff_initial
+        while True:
+            try:
+                if not self.resource_version or not getattr(source, "supports_watch_resume", True):
+                    await self.relist(source)
+                async for event in source.watch_pods(self.namespace, self.resource_version):
+                    self.apply(event)
+                    backoff = self.backoff_initial
+                # Server closed the watch normally (timeoutSeconds); reconnect from resource_version
+            except WatchExpired:
+                print("Pod watch expired, relisting")
+                self.warm = False
+                self.resource_version = ""
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.warm = False
+                if isinstance(e, KubernetesBackendError) and e.status_code == 410:
+                    self.resource_version = ""
+                print(f"Pod watch error: {e}. Retrying in {backoff}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+
+    async def relist(self, source):
+        pod_list = await source.list_pods(self.namespace)
+        for key in list(self.pods):
+            self.remove_pod(self.pods[key])
+        for pod in pod_list.get("items", []):
+            self.update_pod(pod)
+        self.resource_version = pod_list.get("metadata", {}).get("resourceVersion", "")
+        self.warm = True
+
+    def apply(self, event: dict):
+        event_type, obj = event.get("type"), event.get("object", {})
+        if event_type == "ERROR":
+            if obj.get("code") == 410:
+                raise WatchExpired(obj.get("message", ""))
+            raise KubernetesBackendError(obj.get("message", "watch error"), obj.get("code"))
+        if event_type in ["ADDED", "MODIFIED"]:
+            self.update_pod(obj)
+        elif event_type == "DELETED":
+            self.remove_pod(obj)
+        self.resource_version = obj.get("metadata", {}).get("resourceVersion", self.resource_version)
+        # The watch is delivering again, so the pod list is current
+        self.warm = True
+
+    def update_pod(self, pod: dict):
+        metadata = pod.get("metadata", {})
+        key = (metadata.get("namespace"), metadata.get("name"))
+        if key in self.pods:
+            # Containers can't change on a live pod, but drop any we no longer see to be safe
+            self.remove_pod(self.pods[key])
+        self.pods[key] = pod
+        record = pod_from_json(pod)
+        for container in record.init_containers + record.containers:
+            status = f"{describe_container_state(container)}, ready={container.ready}, restarts={container.restart_count}"
+            self.context_manager.update_container_status(container_key(pod, container.name), status)
+
+    def remove_pod(self, pod: dict):
+        metadata = pod.get("metadata", {})
+        self.pods.pop((metadata.get("namespace"), metadata.get("name")), None)
+        spec = pod.get("spec", {})
+        for container in spec.get("initContainers", []) + spec.get("containers", []):
+            self.context_manager.remove_container(container_key(pod, container["name"]))
+
+
+def warm_pod_list(namespace: str) -> dict:
+    # Pod list for a namespace from a warm watcher, or None if no watcher covers it
+    for watcher in active_watchers:
+        if watcher.warm and watcher.namespace in ["", namespace]:
+            return {
+                "metadata": {"resourceVersion": watcher.resource_version},
+                "items": [pod for (pod_namespace, _), pod in watcher.pods.items() if pod_namespace == namespace],
+            }
+    return None
@@ -0,0 +1,57 @@
+# File: pod-patrol/prefetch.py
+
+import asyncio
+from question_targets import extract_namespaces, extract_pod_names, DEFAULT_NAMESPACE
+from tools import load_snapshot, cached_logs_summary
+from evidence import log_target
+from telemetry import tracer
+from constants import PREFETCH_MAX_PODS, PREFETCH_HISTORY_MESSAGES
+
+"""
+Speculative tool prefetch, started when an agent run starts and running alongside its first model turn.
+The pods and namespaces the question names (or, failing that, the recent conversation names) are checked against
+the namespace snapshot, which is what K8s_Get_Pods, K8s_Get_Events and K8s_Describe_Pod read from. Then the
+logs of each named pod, or each unhealthy pod if none is named, are fetched too: what get_logs reads with its
+default arguments (container "", current run), and the failing container's previous run if it crashed,
+LOG_TAIL_LINES lines each. Everything lands in the tool cache under the keys the
+tools use, so the agent's calls are cache hits or join a fetch already in flight instead of each costing a
+serial round trip. Failures are left for the tools to report (errors are never cached).
+"""
+
+
+def recent_texts(question: str, history: list) -> list:
+    # The question first, then the latest messages of the conversation, newest first
+    return [question] + [item["content"] for item in reversed(history[-PREFETCH_HISTORY_MESSAGES:])]
+
+def prefetch_namespaces(texts: list) -> list:
+    # Namespaces the question names, otherwise the latest ones named in the conversation, otherwise "default"
+    for text in texts:
+        found = extract_namespaces(text, default=None)
+        if found != [None]:
+            return found
+    return [DEFAULT_NAMESPACE]
+
+async def prefetch_namespace(namespace: str, texts: list):
+    snapshot = await load_snapshot(namespace)
+    # Only names that are real pods count; extract_pod_names also returns ordinary words next to "pod"
+    named = {}
+    for text in texts:
+        for name in extract_pod_names(text):
+            pod = snapshot.get_pod(name, namespace)
+            if pod is not None:
+                named.setdefault(pod.name, pod)
+    targets = (list(named.values()) or snapshot.unhealthy_pods(namespace))[:PREFETCH_MAX_PODS]
+    calls = []
+    for pod in targets:
+        container, previous = log_target(pod)
+        calls.append(cached_logs_summary(pod.name, namespace))
+        if previous:
+            calls.append(cached_logs_summary(pod.name, namespace, container, True))
+    await asyncio.gather(*calls, return_exceptions=True)
+
+async def prefetch_tools(question: str, history: list):
+    texts = recent_texts(question, history)
+    namespaces = prefetch_namespaces(texts)
+    with tracer.span("prefetch", namespaces=",".join(namespaces)):
+        await asyncio.gather(*[prefetch_namespace(namespace, texts) for namespace in namespaces],
+                             return_exceptions=True)
@@ -0,0 +1,53 @@
+# File: pod-patrol/question_targets.py
+
+import re
+
+"""
+Pulls Kubernetes object names out of free-text questions, e.g. "why is api-7f9c crashing in -n payments".
+Used to decide which namespaces' cluster state an answer depends on, and which pods a question is about.
+"""
+
+DEFAULT_NAMESPACE = "default"
+# DNS-1123 label, which is what namespace names must be
+NAME = r"([a-z0-9](?:[-a-z0-9]*[a-z0-9])?)"
+NAMESPACE_PATTERNS = [
+    re.compile(rf"(?:^|\s)(?:-n|--namespace)[ =]{NAME}\b"),
+    re.compile(rf"\bnamespace[: ]+{NAME}\b", re.IGNORECASE),
+    re.compile(rf"\b(?:the|in|from|of) {NAME} namespace\b", re.IGNORECASE),
+]
+# Pod names are DNS-1123 subdomains, so dots are allowed too
+POD_NAME = r"([a-z0-9](?:[-a-z0-9.]*[a-z0-9])?)"
+POD_PATTERNS = [
+    re.compile(rf"\bpods?[:/ ]+{POD_NAME}\b", re.IGNORECASE),
+    re.compile(rf"\bdescribe (?:the )?{POD_NAME}\b", re.IGNORECASE),
+    re.compile(rf"\blogs? (?:of|for|from) (?:the )?{POD_NAME}\b", re.IGNORECASE),
+    re.compile(rf"\b{POD_NAME} pod\b", re.IGNORECASE),
+]
+# Words that land next to "namespace" or "pod" in plain English and are never meant as one
+NOT_NAMES = {
+    "a", "all", "and", "any", "are", "each", "every", "for", "in", "is", "my", "of", "our", "same", "that", "the",
+    "this", "to", "was", "which", "your", "its", "their", "whole", "entire", "another", "other",
+    "pod", "pods", "container", "containers", "logs", "keeps", "has", "have", "with", "named", "called", "it",
+    "describe", "show", "list", "get", "what", "which", "why", "how", "one",
+}
+
+
+def extract_namespaces(text: str, default: str = DEFAULT_NAMESPACE) -> list:
+    found = []
+    for pattern in NAMESPACE_PATTERNS:
+        for match in pattern.finditer(text):
+            name = match.group(1).lower()
+            if name not in NOT_NAMES and name not in found:
+                found.append(name)
+    return found or [default]
+
+
+def extract_pod_names(text: str) -> list:
+    # Candidate pod names only; callers check them against the cluster before trusting them
+    found = []
+    for pattern in POD_PATTERNS:
+        for match in pattern.finditer(text):
+            name = match.group(1).lower()
+            if name not in NOT_NAMES and name not in found:
+                found.append(name)
+    return found
@@ -0,0 +1,267 @@
+# File: pod-patrol/replay.py
+
+import asyncio
+import json
+import re
+import time
+from collections import Counter
+from agents import Model, ModelProvider, Usage
+from agents.items import ModelResponse
+from openai.types.responses import (Response, ResponseCompletedEvent, ResponseFunctionToolCall, ResponseOutputMessage,
+                                    ResponseOutputText, ResponseTextDeltaEvent, ResponseUsage)
+from k8s_backend import KubernetesBackend, KubernetesBackendError
+from snapshot import ClusterSnapshot
+from context_manager import estimate_tokens
+from evidence import EVIDENCE_HEADER
+
+"""
+Offline stand-ins for the cluster and the model, used by benchmark.py.
+A fixture is one failure scenario: the pod and event lists of a namespace, the logs (or log errors) of its pods, how
+long each call takes, the question to ask and a reference answer. The fixtures shipped in benchmark_fixtures/ are
+hand-written in the format record_fixture produces (the faulty-app one after the k3d-cluster deployment); their image
+digests, container IDs and UIDs are placeholders.
+FixtureBackend replays a fixture as a KubernetesBackend (set it with set_backend), sleeping for the fixture's latency
+so cache and concurrency effects still show. ScriptedModel answers every agent deterministically (streamed or not):
+it calls the agent's tools in a fixed order against the fixture's failing pod, then answers (candidates) or votes
+(verifiers).
+record_fixture captures a new fixture from a live cluster, targeting the first unhealthy pod or a named one (the
+missing ConfigMap key in k3d-cluster leaves its pod Running and Ready, so only its logs show the fault).
+"""
+
+
+def log_key(pod_name: str, container: str, previous: bool) -> str:
+    return f"{pod_name}/{container}" + ("/previous" if previous else "")
+
+
+class FixtureBackend(KubernetesBackend):
+    name = "fixture"
+
+    def __init__(self, fixture: dict, latency_scale: float = 1.0):
+        self.fixture = fixture
+        self.latency_scale = latency_scale
+        self.calls = Counter()
+
+    async def delay(self, call: str):
+        self.calls[call] += 1
+        latency = self.fixture.get("latency", {}).get(call, 0) * self.latency_scale
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    def items(self, kind: str, namespace: str) -> dict:
+        listing = self.fixture[kind]
+        items = [item for item in listing.get("items", [])
+                 if not namespace or item.get("metadata", {}).get("namespace") == namespace]
+        return {**listing, "items": items}
+
+    async def list_pods(self, namespace: str) -> dict:
+        await self.delay("list_pods")
+        return self.items("pods", namespace)
+
+    async def get_pod(self, pod_name: str, namespace: str) -> dict:
+        await self.delay("get_pod")
+        for pod in self.items("pods", namespace)["items"]:
+            if pod["metadata"]["name"] == pod_name:
+                return pod
+        raise KubernetesBackendError(f'pods "{pod_name}" not found', 404)
+
+    async def list_events(self, namespace: str) -> dict:
+        await self.delay("list_events")
+        return self.items("events", namespace)
+
+    async def stream_logs(self, pod_name: str, namespace: str, container: str = "", previous: bool = False,
+                          tail_lines: int = 0, since_seconds: int = 0):
+        await self.delay("stream_logs")
+        if not container:
+            pod = await self.get_pod(pod_name, namespace)
+            container = pod["spec"]["containers"][0]["name"]
+        key = log_key(pod_name, container, previous)
+        if key in self.fixture.get("log_errors", {}):
+            status_code, message = self.fixture["log_errors"][key]
+            raise KubernetesBackendError(message, status_code)
+        if key not in self.fixture.get("logs", {}):
+            raise KubernetesBackendError(f'previous terminated container "{container}" in pod "{pod_name}" not found'
+                                         if previous else f'container {container} is not valid for pod {pod_name}', 400)
+        lines = self.fixture["logs"][key]
+        for line in lines[-tail_lines:] if tail_lines else lines:
+            yield line
+
+
+# -------------------------------
+# Scripted model
+# -------------------------------
+class ScriptedModel(Model):
+    def __init__(self, fixture: dict, latency: float = 0.0, weak: bool = False):
+        self.fixture = fixture
+        self.latency = latency
+        # A weak model gathers the same evidence but answers without naming the root cause, so verifiers reject it
+        self.weak = weak
+        self.turns = 0
+
+    def plan(self) -> list:
+        # Tool call batches in the order an agent would make them; each agent only makes the calls it has tools for
+        namespace = self.fixture["namespace"]
+        target = self.fixture["target"]
+        return [
+            [("K8s_Get_Pods", {"namespace": namespace})],
+            [
+                ("K8s_Describe_Pod", {"pod_name": target["pod"], "namespace": namespace}),
+                # Default arguments, the way a model usually calls it first
+                ("K8s_Get_Logs", {"pod_name": target["pod"], "namespace": namespace, "container": "",
+                                  "previous": False, "tail_lines": 0, "since_seconds": 0, "pattern": "",
+                                  "min_severity": ""}),
+                ("K8s_Get_Events", {"namespace": namespace}),
+            ],
+        ]
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs,
+                           tracing) -> ModelResponse:
+        self.turns += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        items = [{"role": "user", "content": input}] if isinstance(input, str) else list(input)
+        tool_names = {tool.name for tool in tools}
+        already_called = {(item.get("name"), item.get("arguments")) for item in items
+                          if item.get("type") == "function_call"}
+
+        output = []
+        for batch in self.plan():
+            calls = [(name, json.dumps(args, sort_keys=True)) for name, args in batch if name in tool_names]
+            pending = [call for call in calls if call not in already_called]
+            if pending:
+                output = [
+                    ResponseFunctionToolCall(id=f"fc_{self.turns}_{i}", call_id=f"call_{self.turns}_{i}", name=name,
+                                             arguments=arguments, type="function_call", status="completed")
+                    for i, (name, arguments) in enumerate(pending)
+                ]
+                break
+        if not output:
+            output = [ResponseOutputMessage(
+                id=f"msg_{self.turns}", role="assistant", status="completed", type="message",
+                content=[ResponseOutputText(text=self.final_text(system_instructions, items), type="output_text",
+                                            annotations=[])],
+            )]
+
+        input_tokens = estimate_tokens(system_instructions or "") + sum(estimate_tokens(json.dumps(item, default=str))
+                                                                        for item in items)
+        output_tokens = sum(estimate_tokens(item.model_dump_json()) for item in output)
+        usage = Usage(requests=1, input_tokens=input_tokens, output_tokens=output_tokens,
+                      total_tokens=input_tokens + output_tokens)
+        return ModelResponse(output=output, usage=usage, referenceable_id=None)
+
+    def final_text(self, system_instructions: str, items: list) -> str:
+        if "verifier" not in (system_instructions or "").lower():
+            if self.weak:
+                return "One of the pods is unhealthy. Check its recent logs and events, then redeploy it."
+            return self.fixture.get("answer") or "No answer recorded for this scenario."
+        # Verifiers vote 1 when the answer under review mentions the scenario's root cause
+        answer = str(next((item.get("content") for item in items if item.get("role") == "user"), ""))
+        # Evidence-based verifiers get the answer followed by the shared evidence bundle; judge the answer alone
+        answer = answer.split("\n\n" + EVIDENCE_HEADER)[0].removeprefix("Suggestion to verify:\n")
+        return "1" if str(self.fixture.get("expected", "")).lower() in answer.lower() else "0"
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs,
+                              tracing):
+        # Same turns as get_response, with message text delivered word by word
+        response = await self.get_response(system_instructions, input, model_settings, tools, output_schema,
+                                           handoffs, tracing)
+        for index, item in enumerate(response.output):
+            if item.type != "message":
+                continue
+            for word in re.findall(r"\S+\s*", item.content[0].text):
+                yield ResponseTextDeltaEvent.model_construct(type="response.output_text.delta", item_id=item.id,
+                                                             output_index=index, content_index=0, delta=word)
+        usage = ResponseUsage.model_construct(input_tokens=response.usage.input_tokens,
+                                              output_tokens=response.usage.output_tokens,
+                                              total_tokens=response.usage.total_tokens)
+        yield ResponseCompletedEvent.model_construct(
+            type="response.completed",
+            response=Response.model_construct(id=f"resp_{self.turns}", object="response", output=response.output,
+                                              usage=usage),
+        )
+
+
+class ScriptedModelProvider(ModelProvider):
+    # One scripted model per model name; the ones listed in weak_models give answers that don't name the cause
+    def __init__(self, fixture: dict, latency: float = 0.0, weak_models: list = ()):
+        self.fixture = fixture
+        self.latency = latency
+        self.weak_models = set(weak_models)
+        self.models = {}
+
+    def get_model(self, model_name: str) -> Model:
+        if model_name not in self.models:
+            self.models[model_name] = ScriptedModel(self.fixture, self.latency, model_name in self.weak_models)
+        return self.models[model_name]
+
+    @property
+    def turns(self) -> int:
+        return sum(model.turns for model in self.models.values())
+
+    def reset(self):
+        for model in self.models.values():
+            model.turns = 0
+
+
+# -------------------------------
+# Recording
+# -------------------------------
+async def timed(latency: dict, call: str, work):
+    start = time.perf_counter()
+    try:
+        return await work
+    finally:
+        # Keep the slowest observation of each call type
+        latency[call] = round(max(latency.get(call, 0), time.perf_counter() - start), 3)
+
+async def collect_logs(backend: KubernetesBackend, latency: dict, pod_name: str, namespace: str, container: str,
+                       previous: bool, logs: dict, log_errors: dict):
+    async def read():
+        return [line async for line in backend.stream_logs(pod_name, namespace, container, previous)]
+    try:
+        logs[log_key(pod_name, container, previous)] = await timed(latency, "stream_logs", read())
+    except KubernetesBackendError as e:
+        log_errors[log_key(pod_name, container, previous)] = [e.status_code, str(e)]
+
+async def record_fixture(backend: KubernetesBackend, scenario: str, question: str, namespace: str,
+                         expected: str = "", answer: str = "", pod_name: str = "") -> dict:
+    # Records everything the scripted agents will ask for about the unhealthy pods of one namespace (and pod_name)
+    latency = {}
+    pod_list = await timed(latency, "list_pods", backend.list_pods(namespace))
+    event_list = await timed(latency, "list_events", backend.list_events(namespace))
+    snapshot = ClusterSnapshot.from_json(pod_list, event_list)
+    unhealthy = snapshot.unhealthy_pods(namespace)
+    if pod_name:
+        target = snapshot.get_pod(pod_name, namespace)
+        if target is None:
+            raise KubernetesBackendError(f'pods "{pod_name}" not found', 404)
+        if target not in unhealthy:
+            unhealthy = [target] + unhealthy
+    elif not unhealthy:
+        raise KubernetesBackendError(f"No unhealthy pods in namespace {namespace} to record (name one with --pod)")
+    else:
+        target = unhealthy[0]
+    await timed(latency, "get_pod", backend.get_pod(target.name, namespace))
+
+    logs, log_errors = {}, {}
+    await asyncio.gather(*[
+        collect_logs(backend, latency, pod.name, namespace, container.name, previous, logs, log_errors)
+        for pod in unhealthy
+        for container in pod.init_containers + pod.containers
+        for previous in ([False, True] if container.restart_count > 0 else [False])
+    ])
+
+    failing = (target.failing_containers or target.containers)[0]
+    return {
+        "scenario": scenario,
+        "question": question,
+        "namespace": namespace,
+        "target": {"pod": target.name, "container": failing.name,
+                   "previous": failing.restart_count > 0 and failing.state != "running"},
+        "expected": expected,
+        "answer": answer,
+        "latency": latency,
+        "pods": pod_list,
+        "events": event_list,
+        "logs": logs,
+        "log_errors": log_errors,
+    }
@@ -0,0 +1,109 @@
+# File: pod-patrol/router.py
+
+import re
+from dataclasses import dataclass
+from question_targets import extract_namespaces, extract_pod_names, DEFAULT_NAMESPACE, NAME, NOT_NAMES
+from tools import run_tool, pods_summary, pod_summary, events_summary, cached_logs_summary
+from telemetry import active_span
+
+"""
+Rule-based pre-triage that sorts questions by how much model they need before any agent runs:
+- lookup: a plain request for one tool's output ("list pods in payments", "describe pod api-7f9c",
+  "show logs for api-7f9c", "get events"), answered directly from that tool without a model
+- simple: a short factual question ("how many pods are running?"), answered by the candidate agent on
+  CANDIDATE_CHEAP_MODEL without validation
+- diagnosis: everything else, and anything asking why something fails or how to fix it, which goes to the
+  reasoning model (and to candidate validation when enabled)
+Anything the rules are unsure about is treated as a diagnosis, so routing can only save work on questions that
+clearly don't need reasoning. Likewise a lookup is only answered directly when it clearly reads one namespace;
+"list pods in all namespaces" or "show logs for api-7f9c in the last hour" go to the agents instead. Every decision is printed and recorded on the current span.
+"""
+
+ROUTE_LOOKUP = "lookup"
+ROUTE_SIMPLE = "simple"
+ROUTE_DIAGNOSIS = "diagnosis"
+
+DIAGNOSIS_PATTERN = re.compile(
+    r"\b(why|fix\w*|debug\w*|diagnos\w*|troubleshoot\w*|wrong|fail\w*|crash\w*|errors?|broken|issues?|problems?|"
+    r"root cause|explain|recommend\w*|should|not (?:working|ready|running|starting)|keeps?|restart\w*|unhealthy|"
+    r"backoff|oom\w*|stuck|slow)\b",
+    re.IGNORECASE,
+)
+LOOKUP_VERB = r"^(?:please\s+|can you\s+|could you\s+)*(?:list|show|get|display|print|give me)\b"
+LOOKUP_PATTERNS = [
+    # (lookup, pattern, needs a pod name)
+    ("logs", re.compile(LOOKUP_VERB + r".*\blogs?\b", re.IGNORECASE), True),
+    ("events", re.compile(LOOKUP_VERB + r".*\bevents\b", re.IGNORECASE), False),
+    ("describe", re.compile(r"^(?:please\s+|can you\s+|could you\s+)*describe\b", re.IGNORECASE), True),
+    ("pods", re.compile(LOOKUP_VERB + r".*\bpods\b", re.IGNORECASE), False),
+]
+# "in payments" / "across prod" without the word "namespace"; only trusted as the last words of a lookup
+SCOPE_PATTERN = re.compile(r"\b(?:in|across)\s+(\S+)", re.IGNORECASE)
+ALL_NAMESPACES_PATTERN = re.compile(r"(?:^|\s)(?:-A|--all-namespaces)\b")
+SIMPLE_PATTERN = re.compile(
+    r"^(?:how many|which|what|list|show|get|is|are|does|do|count)\b", re.IGNORECASE
+)
+# Longer questions are rarely simple lookups even when they start like one
+SIMPLE_MAX_WORDS = 12
+
+
+@dataclass
+class Route():
+    tier: str
+    reason: str
+    lookup: str = ""
+    namespace: str = DEFAULT_NAMESPACE
+    pod_name: str = ""
+
+
+def lookup_namespace(question: str) -> str:
+    # The one namespace a lookup reads, or None if the question's scope isn't clearly a single namespace
+    if ALL_NAMESPACES_PATTERN.search(question):
+        return None
+    namespaces = extract_namespaces(question, default=None)
+    if namespaces != [None]:
+        return namespaces[0] if len(namespaces) == 1 else None
+    scopes = SCOPE_PATTERN.findall(question)
+    if not scopes:
+        return DEFAULT_NAMESPACE
+    name = scopes[0].rstrip("?.!")
+    if len(scopes) == 1 and question.rstrip("?.! ").endswith(name) and re.fullmatch(NAME, name) \
+            and name not in NOT_NAMES:
+        return name
+    return None
+
+def route_question(question: str) -> Route:
+    question = question.strip()
+    diagnosis = DIAGNOSIS_PATTERN.search(question)
+    if diagnosis:
+        return Route(ROUTE_DIAGNOSIS, f"asks about '{diagnosis.group(0).lower()}'")
+
+    namespace = lookup_namespace(question)
+    for lookup, pattern, needs_pod in LOOKUP_PATTERNS:
+        if not pattern.search(question):
+            continue
+        pod_names = extract_pod_names(question)
+        if namespace is None or (needs_pod and len(pod_names) != 1):
+            break
+        return Route(ROUTE_LOOKUP, f"{lookup} lookup", lookup, namespace, pod_names[0] if needs_pod else "")
+
+    if SIMPLE_PATTERN.search(question) and len(question.split()) <= SIMPLE_MAX_WORDS:
+        return Route(ROUTE_SIMPLE, "short factual question")
+    return Route(ROUTE_DIAGNOSIS, "no simpler route matched")
+
+def log_route(route: Route):
+    print(f"Routing to {route.tier} ({route.reason})")
+    span = active_span()
+    span.set("route", route.tier)
+    span.set("route_reason", route.reason)
+
+async def answer_lookup(route: Route) -> str:
+    if route.lookup == "pods":
+        return await run_tool("get_pods", pods_summary(route.namespace), namespace=route.namespace)
+    if route.lookup == "events":
+        return await run_tool("get_events", events_summary(route.namespace), namespace=route.namespace)
+    if route.lookup == "describe":
+        return await run_tool("describe_pod", pod_summary(route.pod_name, route.namespace),
+                              namespace=route.namespace, pod=route.pod_name)
+    return await run_tool("get_logs", cached_logs_summary(route.pod_name, route.namespace),
+                          namespace=route.namespace, pod=route.pod_name)
@@ -0,0 +1,267 @@
+# File: pod-patrol/service.py
+
+import asyncio
+import copy
+import json
+import signal
+import time
+from agent_wrapper import AgentWrapper
+from context_manager import ContextManager
+from judge_agent import verify_candidates, candidate_answer_agent
+from tool_cache import tool_cache
+from answer_cache import AnswerCache
+from router import Route, route_question, log_route, answer_lookup, ROUTE_LOOKUP, ROUTE_SIMPLE, ROUTE_DIAGNOSIS
+from signatures import diagnose_known_failures
+from telemetry import tracer, active_span
+from constants import CANDIDATE_CHEAP_MODEL, SERVICE_MAX_CONCURRENCY, SERVICE_REQUEST_TIMEOUT, SERVICE_MAX_BODY_BYTES
+
+"""
+Answering questions outside the interactive prompt.
+answer_question is the per-question pipeline shared by every mode. DiagnosisService answers many requests at once,
+each in its own forked context and agent so concurrent requests never see each other's conversation, while all of
+them share the process-wide tool cache, backend connection pool and answer cache.
+It runs either a batch (questions from a file, results as JSONL) or a small HTTP/1.1 server on host:port or a
+Unix socket:
+
+POST /diagnose  {"question": "...", "validate": true, "candidate_num": 3, "id": "alert-42"}
+GET  /healthz
+"""
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error", 504: "Gateway Timeout"}
+
+
+async def answer_question(inputs, question: str, canonical_context: ContextManager, starting_agent: AgentWrapper,
+                          answer_cache: AnswerCache, refresh: bool = True):
+    # inputs carries the PodPatrolInputs routing and validation settings.
+    # Returns (answer, canonical context to use for the next question)
+    # Lookups are answered from tool output and simple questions by the cheap model, even in validation mode.
+    # Known failure classes are answered by the signature rules; their partial matches go to the agent as context
+    # A validated answer replaces the canonical context with the winner's; the agent has to answer in the current one
+    starting_agent.context_manager = canonical_context
+    if refresh:
+        # Every agent answering this question shares one cluster snapshot; start fresh for each question
+        tool_cache.invalidate()
+    route = Route(ROUTE_DIAGNOSIS, "routing disabled") if inputs.no_routing else route_question(question)
+    log_route(route)
+    if route.tier == ROUTE_LOOKUP:
+        answer = await answer_lookup(route)
+        canonical_context.add_user_input(question)
+        canonical_context.add_assistant_response(answer)
+        return answer, canonical_context
+    if route.tier == ROUTE_SIMPLE:
+        return await starting_agent.with_model(CANDIDATE_CHEAP_MODEL).get_response(question), canonical_context
+    if not inputs.no_rules:
+        rules = await diagnose_known_failures(question)
+        if rules.conclusive:
+            answer = rules.answer()
+            active_span().set("answered_by", "rules")
+            canonical_context.add_user_input(question)
+            canonical_context.add_assistant_response(answer)
+            return answer, canonical_context
+        if rules.matched:
+            canonical_context.add_note(rules.note())
+    if not inputs.validate_solution:
+        return await starting_agent.get_response(question), canonical_context
+
+    print("Validating solution...")
+    cached_answer, fingerprint = None, None
+    conversation = canonical_context.get_context()
+    if answer_cache is not None:
+        cached_answer, fingerprint = await answer_cache.lookup("validated", question, conversation)
+    if cached_answer is not None:
+        print("Cluster state is unchanged since this was last answered, using the cached answer.")
+        canonical_context.add_user_input(question)
+        canonical_context.add_assistant_response(cached_answer)
+        return cached_answer, canonical_context
+
+    canonical_agent = await verify_candidates(question, inputs.candidate_num, canonical_context,
+                                              inputs.candidate_concurrency, inputs.early_exit,
+                                              inputs.verifier_timeout, inputs.adaptive, inputs.score_threshold,
+                                              inputs.stream, not inputs.verifier_tools, not inputs.no_prefetch)
+    answer = canonical_agent.result.final_output
+    if fingerprint is not None:
+        answer_cache.set("validated", question, fingerprint, answer, conversation)
+    # The winning candidate's context becomes the canonical one
+    return answer, canonical_agent.context_manager
+
+
+def parse_batch_line(line: str):
+    # A batch file has one request per line: a plain question, or a JSON request like the HTTP body
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    return json.loads(line) if line.startswith("{") else {"question": line}
+
+
+class DiagnosisService():
+    def __init__(self, inputs, base_context: ContextManager, answer_cache: AnswerCache = None,
+                 max_concurrency: int = SERVICE_MAX_CONCURRENCY, request_timeout: float = SERVICE_REQUEST_TIMEOUT):
+        self.inputs = inputs
+        # Requests start from a fork of this context (a pod watcher may keep its container statuses current)
+        self.base_context = base_context
+        self.answer_cache = answer_cache
+        self.semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self.request_timeout = request_timeout
+        self.in_flight = 0
+        self.completed = 0
+
+    def request_options(self, request: dict):
+        # Per-request overrides of the command line settings; raises ValueError for a malformed request
+        question = request.get("question")
+        if not isinstance(question, str) or not question.strip():
+            raise ValueError("'question' is required")
+        validate = request.get("validate", self.inputs.validate_solution)
+        candidate_num = request.get("candidate_num", self.inputs.candidate_num)
+        if not isinstance(validate, bool):
+            raise ValueError("'validate' must be true or false")
+        if not isinstance(candidate_num, int) or isinstance(candidate_num, bool) or candidate_num < 1:
+            raise ValueError("'candidate_num' must be a positive integer")
+        options = copy.copy(self.inputs)
+        options.validate_solution = validate
+        options.candidate_num = candidate_num
+        # Concurrent requests would interleave on the terminal
+        options.stream = False
+        return options
+
+    async def diagnose(self, request: dict) -> dict:
+        # Never raises: failures are reported in the result's "error" field
+        result = {"id": request.get("id"), "question": request.get("question", "")}
+        try:
+            options = self.request_options(request)
+        except ValueError as e:
+            result["error"] = str(e)
+            return result
+        result["validated"] = options.validate_solution
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            async with self.semaphore:
+                context = self.base_context.fork()
+                agent = AgentWrapper(candidate_answer_agent, context_manager=context, answer_cache=self.answer_cache,
+                                     prefetch=not options.no_prefetch)
+                with tracer.span("request", validated=options.validate_solution) as span:
+                    # Concurrent requests share the tool cache (TTL-bound) instead of each starting fresh
+                    result["answer"], _ = await asyncio.wait_for(
+                        answer_question(options, result["question"], context, agent, self.answer_cache, refresh=False),
+                        timeout=self.request_timeout,
+                    )
+                    for attribute in ["route", "answered_by", "candidates_spent"]:
+                        if attribute in span.attributes:
+                            result[attribute] = span.attributes[attribute]
+        except asyncio.TimeoutError:
+            result["error"] = f"timed out after {self.request_timeout}s"
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        return result
+
+    # -------------------------------
+    # Batch mode
+    # -------------------------------
+    async def run_batch(self, batch_file: str, output_file: str):
+        requests = []
+        with open(batch_file) as f:
+            for number, line in enumerate(f, start=1):
+                try:
+                    request = parse_batch_line(line)
+                except json.JSONDecodeError as e:
+                    request = {"id": f"line {number}", "error": f"invalid JSON: {e}"}
+                if request is not None:
+                    requests.append(request)
+
+        async def run(request: dict) -> dict:
+            if "error" in request:
+                return request
+            return await self.diagnose(request)
+
+        print(f"Answering {len(requests)} questions from {batch_file}...")
+        results = await asyncio.gather(*[run(request) for request in requests])
+        with open(output_file, "w") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+        failed = sum(1 for result in results if "error" in result)
+        print(f"Wrote {len(results)} results ({failed} failed) to {output_file}")
+
+    # -------------------------------
+    # Server mode
+    # -------------------------------
+    async def serve(self, address: str):
+        if address.startswith("unix:"):
+            server = await asyncio.start_unix_server(self.handle_connection, path=address[len("unix:"):])
+        else:
+            host, _, port = address.rpartition(":")
+            server = await asyncio.start_server(self.handle_connection, host or "127.0.0.1", int(port))
+        print(f"Serving diagnosis requests on {address} (POST /diagnose, GET /healthz)")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in [signal.SIGINT, signal.SIGTERM]:
+            loop.add_signal_handler(sig, stop.set)
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            for sig in [signal.SIGINT, signal.SIGTERM]:
+                loop.remove_signal_handler(sig)
+        print("Server stopped")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Minimal HTTP/1.1 with keep-alive; one request at a time per connection
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in [b"\r\n", b"\n", b""]:
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > SERVICE_MAX_BODY_BYTES:
+                    await self.respond(writer, 413, {"error": f"body larger than {SERVICE_MAX_BODY_BYTES} bytes"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.route(method, path.split("?", 1)[0], body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method: str, path: str, body: bytes):
+        if path == "/healthz":
+            return 200, {"status": "ok", "in_flight": self.in_flight, "completed": self.completed}
+        if path != "/diagnose":
+            return 404, {"error": f"no route for {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            return 400, {"error": f"invalid JSON: {e}"}
+        if not isinstance(request, dict):
+            return 400, {"error": "body must be a JSON object"}
+        try:
+            self.request_options(request)
+        except ValueError as e:
+            return 400, {"id": request.get("id"), "error": str(e)}
+        result = await self.diagnose(request)
+        if "error" in result:
+            return 504 if result["error"].startswith("timed out") else 500, result
+        return 200, result
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool):
+        body = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
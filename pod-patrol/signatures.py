@@ -0,0 +1,380 @@
+# File: pod-patrol/signatures.py
+
+import asyncio
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from question_targets import extract_namespaces, extract_pod_names
+from snapshot import PodRecord, ContainerRecord, describe_container_state
+from tools import load_snapshot, cached_logs_summary
+from evidence import log_target
+from fleet_scan import workload_name
+from telemetry import tracer
+from constants import EVIDENCE_LOG_LINES, RULES_MAX_PODS
+
+"""
+Deterministic fast path for well-known failure classes, tried before any model runs.
+A library of FailureSignatures (missing ConfigMap/Secret key or object, unset environment variable, OOM kill,
+image pull failure, crash loop) is matched against the pods a question is about. The engine indexes the
+signatures by container state reason and event reason (dict lookups), and compiles all message patterns and
+all log patterns into one alternation each. That alternation is only a prefilter, so most lines are rejected in one
+pass however large the library grows. Each pattern then runs on its own over the lines it let through, so
+overlapping patterns (a generic ERROR line that also names a missing variable) all see the line.
+Logs are only fetched, through the shared tool cache, for pods that status and events alone don't explain.
+
+When every pod the question names (directly or through its workload) is explained by a signature, the answer is
+rendered from the signatures without a model call. Otherwise the matches are handed to the agent as a context
+note. Add signatures with register_signature(); each one's explain() returns None when its evidence isn't
+enough to name a root cause, and the next matching signature gets a chance.
+"""
+
+# Turns the named groups of a pattern into plain groups, so patterns can share one alternation
+NAMED_GROUP = re.compile(r"\(\?P<\w+>")
+# "NAME <- configmap app-config key MISSING_KEY (optional)" (see snapshot.env_ref)
+ENV_REF_PATTERN = re.compile(r"^(?P<env>\S+) <- (?P<kind>configmap|secret) (?P<object>\S+) key (?P<key>\S+)")
+EXCEPTION_LINE = re.compile(r"\b\w+(?:Error|Exception)\b")
+
+
+@dataclass
+class FailureSignature():
+    name: str
+    explain: object  # function(SignatureMatch) -> answer text, or None if the evidence doesn't name a root cause
+    container_reasons: tuple = ()  # container state or last termination reasons, matched exactly
+    event_reasons: tuple = ()  # reasons of the pod's events, matched exactly
+    message_patterns: tuple = ()  # regexes over container state messages and the pod's event messages
+    log_patterns: tuple = ()  # regexes over log lines of the pod's failing container
+    examples: tuple = ()  # message or log lines the signature must match; checked when the engine is built
+
+
+@dataclass
+class SignatureMatch():
+    signature: FailureSignature
+    pod: PodRecord
+    container: ContainerRecord
+    events: list
+    evidence: list = field(default_factory=list)  # what triggered the signature, one line each
+    groups: dict = field(default_factory=dict)  # named groups captured by its patterns
+    answer: str = None
+
+
+class PatternScanner():
+    # All patterns in one alternation rejects non-matching lines in a single pass. A line it hits is run against
+    # every pattern on its own: an alternation only reports one pattern per position, which would hide the others.
+    def __init__(self, entries: list):
+        self.entries = [(signature, re.compile(pattern)) for signature, pattern in entries]
+        alternatives = [f"(?P<p{i}>{NAMED_GROUP.sub('(?:', pattern)})" for i, (_, pattern) in enumerate(entries)]
+        self.combined = re.compile("|".join(alternatives)) if alternatives else None
+
+    def scan(self, lines):
+        # Yields (signature, line, groups)
+        if self.combined is None:
+            return
+        for line in lines:
+            if not self.combined.search(line):
+                continue
+            for signature, pattern in self.entries:
+                hit = pattern.search(line)
+                if hit:
+                    yield signature, line.strip(), hit.groupdict()
+
+
+class SignatureEngine():
+    def __init__(self, signatures: list):
+        self.signatures = list(signatures)
+        self.by_container_reason = defaultdict(list)
+        self.by_event_reason = defaultdict(list)
+        for signature in self.signatures:
+            for reason in signature.container_reasons:
+                self.by_container_reason[reason].append(signature)
+            for reason in signature.event_reasons:
+                self.by_event_reason[reason].append(signature)
+        self.messages = PatternScanner([(s, pattern) for s in self.signatures for pattern in s.message_patterns])
+        self.logs = PatternScanner([(s, pattern) for s in self.signatures for pattern in s.log_patterns])
+        for signature in self.signatures:
+            for line in signature.examples:
+                matched = {s.name for s, _, _ in self.messages.scan([line])} | {s.name for s, _, _ in self.logs.scan([line])}
+                if signature.name not in matched:
+                    raise ValueError(f"Signature {signature.name} doesn't match its example: {line}")
+
+    def match(self, pod: PodRecord, events: list, log_lines: list = (), log_container: str = "") -> list:
+        # Every signature the pod matches, in library order (most specific first), with its answer filled in
+        found = {}
+
+        def hit(signature: FailureSignature, container: ContainerRecord, evidence: str, groups: dict):
+            match = found.get(signature.name)
+            if match is None:
+                match = found[signature.name] = SignatureMatch(signature, pod, container, events)
+            if evidence not in match.evidence:
+                match.evidence.append(evidence)
+            for name, value in groups.items():
+                if value is not None:
+                    match.groups.setdefault(name, value)
+
+        failing = pod.failing_containers or pod.containers
+        for container in failing:
+            for reason in {container.reason, container.last_reason} - {""}:
+                for signature in self.by_container_reason.get(reason, []):
+                    hit(signature, container, f"container {container.name}: {describe_container_state(container)}", {})
+            for signature, line, groups in self.messages.scan([container.message] if container.message else []):
+                hit(signature, container, f"container {container.name}: {line}", groups)
+        # Events and logs are attributed to the failing container (the one whose logs were read)
+        default = next((c for c in failing if c.name == log_container), failing[0] if failing else None)
+        for event in events:
+            for signature in self.by_event_reason.get(event.reason, []):
+                hit(signature, default, f"event {event.reason}: {event.message}", {})
+            for signature, line, groups in self.messages.scan([event.message]):
+                hit(signature, default, f"event {event.reason}: {line}", groups)
+        for signature, line, groups in self.logs.scan(log_lines):
+            hit(signature, default, f"log: {line}", groups)
+
+        matches = [found[signature.name] for signature in self.signatures if signature.name in found]
+        for match in matches:
+            match.answer = match.signature.explain(match)
+        return matches
+
+
+def root_cause(matches: list) -> SignatureMatch:
+    return next((match for match in matches if match.answer is not None), None)
+
+
+# -------------------------------
+# Signature library
+# -------------------------------
+def exit_text(container: ContainerRecord) -> str:
+    if container.last_exit_code is None:
+        return ""
+    return f" (exit code {container.last_exit_code}, {container.restart_count} restarts)"
+
+def env_refs(container: ContainerRecord) -> list:
+    return [ref.groupdict() for ref in map(ENV_REF_PATTERN.match, container.env_refs) if ref]
+
+def explain_missing_config_key(match: SignatureMatch) -> str:
+    key, env, container = match.groups.get("key"), match.groups.get("env"), match.container
+    if container is None:
+        return None
+    ref = next((ref for ref in env_refs(container) if ref["key"] == key or ref["env"] == env), None)
+    if ref is None:
+        return None
+    kind = "ConfigMap" if ref["kind"] == "configmap" else "Secret"
+    if container.reason == "CreateContainerConfigError":
+        effect = "so the container can't start (CreateContainerConfigError)"
+    else:
+        effect = "and as the reference is optional, the variable is silently left unset"
+    return (f"Container {container.name} in pod {match.pod.name} reads {ref['env']} from key {ref['key']} of "
+            f"{kind} {ref['object']}, but that key doesn't exist, {effect}. Add {ref['key']} to the {kind} "
+            f"{ref['object']} (or point {ref['env']} at a key that exists) and restart the pods.")
+
+def explain_missing_config_object(match: SignatureMatch) -> str:
+    kind = "ConfigMap" if match.groups.get("kind", "").lower() == "configmap" else "Secret"
+    name = match.groups.get("object")
+    container = match.container.name if match.container else "its containers"
+    return (f"Pod {match.pod.name} references {kind} {name}, which doesn't exist in namespace "
+            f"{match.pod.namespace}, so {container} can't start. Create the {kind} (or fix its name in the "
+            f"deployment) and the pods will start.")
+
+def explain_missing_env_var(match: SignatureMatch) -> str:
+    env, container = match.groups.get("env"), match.container
+    if container is None or any(ref["env"] == env for ref in env_refs(container)):
+        # Set from a ConfigMap or Secret: explain_missing_config_key's case, if anything
+        return None
+    line = next(evidence for evidence in match.evidence if evidence.startswith("log: "))[len("log: "):]
+    return (f"Container {container.name} in pod {match.pod.name} fails on startup{exit_text(container)} because "
+            f"it reads the environment variable {env}, which its spec doesn't set (log: `{line}`). Add {env} "
+            f"to the container's env (from a ConfigMap or Secret if it holds configuration or credentials) and "
+            f"roll out the change.")
+
+def explain_oom_killed(match: SignatureMatch) -> str:
+    pod = match.pod
+    container = next((c for c in pod.init_containers + pod.containers if "OOMKilled" in [c.reason, c.last_reason]),
+                     match.container)
+    if container is None:
+        return None
+    limit = container.limits.get("memory")
+    cause = (f"it needs more memory than its {limit} limit" if limit
+             else "its node runs out of memory (it has no memory limit)")
+    fix = ("Raise the memory limit (and request) to fit its peak usage, or reduce how much it holds in memory."
+           if limit else "Give it a memory request and limit that fit its usage, or reduce how much it holds in memory.")
+    return (f"Container {container.name} in pod {pod.name} is being OOMKilled (exit code 137, "
+            f"{container.restart_count} restarts): {cause}. {fix}")
+
+# (pattern over the pull error, cause, fix)
+PULL_FAILURES = [
+    (re.compile(r"not found|manifest unknown|NotFound", re.IGNORECASE),
+     "that image or tag doesn't exist in the registry",
+     "Fix the image name or tag in the deployment, or push {image} to the registry."),
+    (re.compile(r"pull access denied|unauthorized|authentication required|forbidden", re.IGNORECASE),
+     "the registry refuses access",
+     "Add an imagePullSecret with credentials for the registry to the pod spec."),
+    (re.compile(r"no such host|i/o timeout|connection refused|TLS handshake timeout", re.IGNORECASE),
+     "the registry can't be reached from the node",
+     "Check the registry host name and the nodes' DNS and network access to it."),
+    (re.compile(r"InvalidImageName|invalid reference format", re.IGNORECASE),
+     "the image reference is malformed",
+     "Fix the image reference in the deployment."),
+]
+
+def explain_image_pull(match: SignatureMatch) -> str:
+    container = match.container
+    if container is None:
+        return None
+    text = "\n".join([container.message, container.reason] + [event.message for event in match.events])
+    for pattern, cause, fix in PULL_FAILURES:
+        if pattern.search(text):
+            return (f"Container {container.name} in pod {match.pod.name} is stuck in {container.reason or 'ErrImagePull'}: "
+                    f"image {container.image} can't be pulled because {cause}. {fix.format(image=container.image)}")
+    return None
+
+def explain_crash_loop(match: SignatureMatch) -> str:
+    container = match.container
+    errors = [evidence[len("log: "):] for evidence in match.evidence if evidence.startswith("log: ")]
+    if container is None or not errors:
+        return None
+    # The exception that ended a traceback says more than the generic ERROR lines after it
+    line = next((line for line in reversed(errors) if EXCEPTION_LINE.search(line)), errors[-1])
+    return (f"Container {container.name} in pod {match.pod.name} is in CrashLoopBackOff: it keeps exiting"
+            f"{exit_text(container)}. Its last run failed with `{line}`. Fix that error (or the configuration "
+            f"it points to) and the container will stop restarting.")
+
+
+SIGNATURES = [
+    FailureSignature(
+        "missing-config-key", explain_missing_config_key,
+        message_patterns=(r"couldn't find key (?P<key>[-._a-zA-Z0-9]+) in (?:ConfigMap|Secret) \S+",),
+        log_patterns=(r"\b(?P<env>[A-Z][A-Z0-9_]+) is not set\b",),
+        examples=("couldn't find key MISSING_KEY in ConfigMap default/app-config",
+                  "WARNING - REQUIRED_ENV is not set! (checked environment)"),
+    ),
+    FailureSignature(
+        "missing-config-object", explain_missing_config_object,
+        message_patterns=(r"(?P<kind>[Cc]onfig[Mm]ap|[Ss]ecret)s? \"(?P<object>[^\"]+)\" not found",),
+        examples=('Error: configmap "app-config" not found',),
+    ),
+    FailureSignature(
+        "missing-env-var", explain_missing_env_var,
+        log_patterns=(
+            r"KeyError: '(?P<env>[A-Z][A-Z0-9_]+)'",
+            r"(?:environment variable|env var)\s+['\"]?(?P<env>[A-Z][A-Z0-9_]+)['\"]?\s+(?:is\s+)?(?:not set|missing|required|undefined)",
+            r"\b(?P<env>[A-Z][A-Z0-9_]+) (?:is not set|must be set|is required)\b",
+        ),
+        # Also matched by missing-config-key's "is not set" and crash-loop's error lines
+        examples=("KeyError: 'DATABASE_URL'", "DATABASE_URL is not set",
+                  "ERROR environment variable DATABASE_URL is required", "[ERROR] KeyError: 'DATABASE_URL'"),
+    ),
+    FailureSignature(
+        "oom-killed", explain_oom_killed,
+        container_reasons=("OOMKilled",),
+        event_reasons=("OOMKilling",),
+    ),
+    FailureSignature(
+        "image-pull", explain_image_pull,
+        container_reasons=("ImagePullBackOff", "ErrImagePull", "InvalidImageName"),
+    ),
+    FailureSignature(
+        "crash-loop", explain_crash_loop,
+        container_reasons=("CrashLoopBackOff",),
+        log_patterns=(r"\b(?:\w+(?:Error|Exception)|FATAL|PANIC|ERROR|panic)\b",),
+        examples=("ERROR environment variable DATABASE_URL is required", "[ERROR] KeyError: 'DATABASE_URL'",
+                  "FATAL: could not connect to server"),
+    ),
+]
+engine = SignatureEngine(SIGNATURES)
+
+
+def register_signature(signature: FailureSignature, before: str = ""):
+    # Adds a signature to the library (ahead of the one named `before`, to take precedence over it) and reindexes
+    global engine
+    names = [s.name for s in SIGNATURES]
+    signatures = list(SIGNATURES)
+    signatures.insert(names.index(before) if before in names else len(signatures), signature)
+    # Raises for a signature that doesn't match its own examples, leaving the library as it was
+    engine = SignatureEngine(signatures)
+    SIGNATURES[:] = signatures
+
+
+# -------------------------------
+# Matching a question
+# -------------------------------
+@dataclass
+class RuleDiagnosis():
+    namespace: str
+    pods: list = field(default_factory=list)
+    matches: dict = field(default_factory=dict)  # pod name -> [SignatureMatch, ...]
+    # The question names these pods or their workload; only then may the rules answer it on their own
+    mentioned: bool = False
+
+    @property
+    def matched(self) -> bool:
+        return any(self.matches.values())
+
+    @property
+    def conclusive(self) -> bool:
+        return self.mentioned and bool(self.pods) and all(root_cause(self.matches[pod.name]) for pod in self.pods)
+
+    def answer(self) -> str:
+        # Replicas failing the same way are reported once
+        grouped = {}
+        for pod in self.pods:
+            match = root_cause(self.matches[pod.name])
+            grouped.setdefault((workload_name(pod), match.signature.name), []).append(match)
+        parts = []
+        for (workload, _), matches in grouped.items():
+            more = f" The same failure affects {len(matches) - 1} more pod(s) of {workload}." if len(matches) > 1 else ""
+            parts.append(matches[0].answer + more)
+        return "\n\n".join(parts)
+
+    def note(self) -> str:
+        lines = [f"Known failure signatures matched in namespace {self.namespace} (by rules; confirm before relying on them):"]
+        for pod in self.pods:
+            for match in self.matches[pod.name]:
+                container = f" container {match.container.name}" if match.container else ""
+                lines.append(f"- pod {pod.name}{container}: {match.signature.name} -- " + "; ".join(match.evidence[:2])[:300])
+        return "\n".join(lines)
+
+
+def question_pods(question: str, snapshot, namespace: str) -> tuple:
+    # (pods, mentioned): the pods the question names, or those of a workload it names (the unhealthy ones, if any
+    # are); otherwise the namespace's unhealthy pods
+    named = [pod for pod in (snapshot.get_pod(name, namespace) for name in extract_pod_names(question)) if pod]
+    if not named:
+        text = question.lower()
+        named = [pod for pod in snapshot.by_namespace.get(namespace, [])
+                 if re.search(rf"(?<![\w-]){re.escape(workload_name(pod).split('/', 1)[1].lower())}(?![\w-])", text)]
+        named = [pod for pod in named if not pod.healthy] or named
+    if named:
+        return named[:RULES_MAX_PODS], True
+    return snapshot.unhealthy_pods(namespace)[:RULES_MAX_PODS], False
+
+async def read_log_lines(pod: PodRecord, namespace: str) -> tuple:
+    # Same container, arguments and cache entry as the verifier evidence
+    container, previous = log_target(pod)
+    try:
+        logs = await cached_logs_summary(pod.name, namespace, container, previous, EVIDENCE_LOG_LINES)
+    except Exception:
+        return container, []
+    return container, logs.splitlines()
+
+async def diagnose_known_failures(question: str) -> RuleDiagnosis:
+    namespace = extract_namespaces(question)[0]
+    start = time.perf_counter()
+    with tracer.span("rules", namespace=namespace) as span:
+        try:
+            snapshot = await load_snapshot(namespace)
+        except Exception as e:
+            span.set("error", f"{type(e).__name__}: {e}")
+            return RuleDiagnosis(namespace)
+        pods, mentioned = question_pods(question, snapshot, namespace)
+        diagnosis = RuleDiagnosis(namespace, pods, mentioned=mentioned)
+        for pod in pods:
+            diagnosis.matches[pod.name] = engine.match(pod, snapshot.pod_events(pod))
+        unexplained = [pod for pod in pods if root_cause(diagnosis.matches[pod.name]) is None]
+        logs = await asyncio.gather(*[read_log_lines(pod, namespace) for pod in unexplained])
+        for pod, (container, lines) in zip(unexplained, logs):
+            diagnosis.matches[pod.name] = engine.match(pod, snapshot.pod_events(pod), lines, container)
+        span.set("pods", len(pods))
+        span.set("signatures", ",".join(sorted({m.signature.name for ms in diagnosis.matches.values() for m in ms})))
+        span.set("conclusive", diagnosis.conclusive)
+    if diagnosis.matched:
+        print(f"Known failure signatures checked in {(time.perf_counter() - start) * 1000:.0f} ms: "
+              + ("answering without a model." if diagnosis.conclusive else "passing the matches to the agent."))
+    return diagnosis
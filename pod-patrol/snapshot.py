@@ -0,0 +1,380 @@
+# File: pod-patrol/snapshot.py
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+"""
+Typed, compact view of the cluster built from `-o json` / API output.
+Pods, containers, conditions and events are reduced to the fields the agents actually use, and
+ClusterSnapshot indexes them by namespace, phase, restart count and owner. The summarize_* helpers
+render short text for the tools instead of raw kubectl tables, so prompts stay small on namespaces
+with thousands of pods.
+"""
+
+# Max pods / events listed one by one in a summary; the rest are counted
+MAX_SUMMARY_PODS = 50
+MAX_SUMMARY_EVENTS = 50
+
+
+@dataclass
+class ContainerRecord:
+    name: str
+    image: str
+    ready: bool = False
+    restart_count: int = 0
+    state: str = "unknown"  # running, waiting or terminated
+    reason: str = ""
+    message: str = ""
+    exit_code: int = None
+    last_reason: str = ""
+    last_exit_code: int = None
+    command: str = ""
+    env_refs: list = field(default_factory=list)
+    limits: dict = field(default_factory=dict)
+    requests: dict = field(default_factory=dict)
+    init: bool = False  # an init container
+    restartable: bool = False  # an init container with restartPolicy Always (a sidecar), which keeps running
+
+
+@dataclass
+class ConditionRecord:
+    type: str
+    status: str
+    reason: str = ""
+    message: str = ""
+
+
+@dataclass
+class PodRecord:
+    name: str
+    namespace: str
+    phase: str
+    status: str
+    node: str = ""
+    owner: str = ""  # "Kind/name" of the first owner reference
+    created: str = ""
+    resource_version: str = ""
+    labels: dict = field(default_factory=dict)
+    containers: list = field(default_factory=list)
+    init_containers: list = field(default_factory=list)
+    conditions: list = field(default_factory=list)
+
+    @property
+    def restart_count(self) -> int:
+        return sum(c.restart_count for c in self.init_containers + self.containers)
+
+    @property
+    def pending_init(self) -> ContainerRecord:
+        # The init container the pod is still waiting on (kubectl's "Init:" statuses), or None once initialized
+        return next((c for c in self.init_containers if not init_finished(c)), None)
+
+    @property
+    def failing_containers(self) -> list:
+        # What keeps the pod from running: the init container it's stuck on, otherwise its unready containers
+        pending = self.pending_init
+        return [pending] if pending is not None else [c for c in self.containers if not c.ready]
+
+    @property
+    def ready(self) -> str:
+        return f"{sum(1 for c in self.containers if c.ready)}/{len(self.containers)}"
+
+    @property
+    def healthy(self) -> bool:
+        if self.phase == "Succeeded":
+            return True
+        return self.phase == "Running" and all(c.ready for c in self.containers)
+
+
+@dataclass
+class EventRecord:
+    namespace: str
+    type: str
+    reason: str
+    object_kind: str
+    object_name: str
+    message: str
+    count: int = 1
+    last_seen: str = ""
+    resource_version: str = ""
+
+
+def init_finished(container: ContainerRecord) -> bool:
+    if container.state == "terminated" and container.exit_code == 0:
+        return True
+    return container.restartable and container.state == "running"
+
+
+# -------------------------------
+# Parsing
+# -------------------------------
+def init_status_reason(pod: dict) -> str:
+    # "Init:<reason>" for the first init container that hasn't finished, as kubectl shows it; None once initialized
+    init_specs = pod.get("spec", {}).get("initContainers", [])
+    restartable = {c["name"] for c in init_specs if c.get("restartPolicy") == "Always"}
+    for i, container in enumerate(pod.get("status", {}).get("initContainerStatuses", [])):
+        state = container.get("state", {})
+        terminated = state.get("terminated")
+        if terminated is not None and terminated.get("exitCode") == 0:
+            continue
+        if container.get("name") in restartable and container.get("started"):
+            continue
+        if terminated is not None:
+            if terminated.get("reason"):
+                return f"Init:{terminated['reason']}"
+            if terminated.get("signal"):
+                return f"Init:Signal:{terminated['signal']}"
+            return f"Init:ExitCode:{terminated.get('exitCode')}"
+        waiting_reason = state.get("waiting", {}).get("reason")
+        if waiting_reason and waiting_reason != "PodInitializing":
+            return f"Init:{waiting_reason}"
+        return f"Init:{i}/{len(init_specs)}"
+    return None
+
+
+def pod_status_reason(pod: dict) -> str:
+    # Same precedence kubectl uses for its STATUS column: a stuck init container hides the app containers
+    status = pod.get("status", {})
+    reason = status.get("reason") or status.get("phase", "Unknown")
+    init_reason = init_status_reason(pod)
+    for container in status.get("containerStatuses", []) if init_reason is None else []:
+        state = container.get("state", {})
+        if state.get("waiting", {}).get("reason"):
+            reason = state["waiting"]["reason"]
+        elif "terminated" in state:
+            terminated = state["terminated"]
+            reason = terminated.get("reason") or f"ExitCode:{terminated.get('exitCode')}"
+    reason = init_reason or reason
+    if pod.get("metadata", {}).get("deletionTimestamp"):
+        reason = "Terminating"
+    return reason
+
+
+def env_ref(env: dict) -> str:
+    # Only env vars that come from other objects are kept; literal values can hold secrets
+    source = env.get("valueFrom", {})
+    for key, kind, label in [("configMapKeyRef", "configmap", "key"), ("secretKeyRef", "secret", "key")]:
+        if key in source:
+            ref = source[key]
+            optional = " (optional)" if ref.get("optional") else ""
+            return f"{env['name']} <- {kind} {ref.get('name')} {label} {ref.get('key')}{optional}"
+    if "fieldRef" in source:
+        return f"{env['name']} <- field {source['fieldRef'].get('fieldPath')}"
+    return None
+
+
+def container_from_json(spec: dict, status: dict, init: bool = False) -> ContainerRecord:
+    container = ContainerRecord(
+        name=spec["name"],
+        image=spec.get("image", ""),
+        ready=status.get("ready", False),
+        restart_count=status.get("restartCount", 0),
+        command=" ".join(spec.get("command", []) + spec.get("args", [])),
+        env_refs=[ref for ref in (env_ref(env) for env in spec.get("env", [])) if ref],
+        limits=spec.get("resources", {}).get("limits", {}),
+        requests=spec.get("resources", {}).get("requests", {}),
+        init=init,
+        restartable=init and spec.get("restartPolicy") == "Always",
+    )
+    for state_name, details in status.get("state", {}).items():
+        container.state = state_name
+        container.reason = details.get("reason", "")
+        container.message = details.get("message", "").strip()
+        container.exit_code = details.get("exitCode")
+    last_terminated = status.get("lastState", {}).get("terminated")
+    if last_terminated:
+        container.last_reason = last_terminated.get("reason", "")
+        container.last_exit_code = last_terminated.get("exitCode")
+    return container
+
+
+def pod_from_json(pod: dict) -> PodRecord:
+    metadata, spec, status = pod.get("metadata", {}), pod.get("spec", {}), pod.get("status", {})
+    statuses = {c["name"]: c for c in status.get("containerStatuses", [])}
+    init_statuses = {c["name"]: c for c in status.get("initContainerStatuses", [])}
+    owners = metadata.get("ownerReferences", [])
+    return PodRecord(
+        name=metadata.get("name", ""),
+        namespace=metadata.get("namespace", ""),
+        phase=status.get("phase", "Unknown"),
+        status=pod_status_reason(pod),
+        node=spec.get("nodeName", ""),
+        owner=f"{owners[0]['kind']}/{owners[0]['name']}" if owners else "",
+        created=metadata.get("creationTimestamp", ""),
+        resource_version=metadata.get("resourceVersion", ""),
+        labels=metadata.get("labels", {}),
+        containers=[container_from_json(c, statuses.get(c["name"], {})) for c in spec.get("containers", [])],
+        init_containers=[container_from_json(c, init_statuses.get(c["name"], {}), init=True)
+                         for c in spec.get("initContainers", [])],
+        conditions=[
+            ConditionRecord(c.get("type", ""), c.get("status", ""), c.get("reason", ""), c.get("message", ""))
+            for c in status.get("conditions", [])
+        ],
+    )
+
+
+def event_from_json(event: dict) -> EventRecord:
+    involved = event.get("involvedObject", {})
+    metadata = event.get("metadata", {})
+    return EventRecord(
+        namespace=involved.get("namespace") or metadata.get("namespace", ""),
+        type=event.get("type", ""),
+        reason=event.get("reason", ""),
+        object_kind=involved.get("kind", ""),
+        object_name=involved.get("name", ""),
+        message=event.get("message", "").strip(),
+        count=event.get("count") or 1,
+        last_seen=event.get("lastTimestamp") or event.get("eventTime") or metadata.get("creationTimestamp") or "",
+        resource_version=metadata.get("resourceVersion", ""),
+    )
+
+
+# -------------------------------
+# Snapshot with indexes
+# -------------------------------
+class ClusterSnapshot():
+    def __init__(self, pods: list, events: list):
+        self.pods = pods
+        self.events = events
+        self.by_name = {}
+        self.by_namespace = defaultdict(list)
+        self.by_phase = defaultdict(list)
+        self.by_owner = defaultdict(list)
+        self.events_by_object = defaultdict(list)
+        for pod in pods:
+            self.by_name[(pod.namespace, pod.name)] = pod
+            self.by_namespace[pod.namespace].append(pod)
+            self.by_phase[pod.phase].append(pod)
+            self.by_owner[pod.owner].append(pod)
+        for event in events:
+            self.events_by_object[(event.namespace, event.object_kind, event.object_name)].append(event)
+        self.by_restarts = sorted(pods, key=lambda pod: pod.restart_count, reverse=True)
+
+    @classmethod
+    def from_json(cls, pod_list: dict, event_list: dict = None):
+        pods = [pod_from_json(item) for item in pod_list.get("items", [])]
+        events = [event_from_json(item) for item in (event_list or {}).get("items", [])]
+        return cls(pods, events)
+
+    def get_pod(self, name: str, namespace: str) -> PodRecord:
+        return self.by_name.get((namespace, name))
+
+    def unhealthy_pods(self, namespace: str = None) -> list:
+        pods = self.by_namespace.get(namespace, []) if namespace else self.pods
+        return [pod for pod in pods if not pod.healthy]
+
+    def top_restarts(self, limit: int = 10) -> list:
+        return [pod for pod in self.by_restarts[:limit] if pod.restart_count > 0]
+
+    def pod_events(self, pod: PodRecord) -> list:
+        return self.events_by_object.get((pod.namespace, "Pod", pod.name), [])
+
+
+# -------------------------------
+# Compact summaries for the tools
+# -------------------------------
+def describe_container_state(container: ContainerRecord) -> str:
+    text = container.state
+    if container.reason:
+        text += f" {container.reason}"
+    if container.exit_code is not None:
+        text += f" (exit {container.exit_code})"
+    if container.last_reason or container.last_exit_code is not None:
+        text += f", last terminated {container.last_reason or 'unknown'} (exit {container.last_exit_code})"
+    return text
+
+
+def container_label(container: ContainerRecord) -> str:
+    return f"init:{container.name}" if container.init else container.name
+
+
+def summarize_pods(snapshot: ClusterSnapshot, namespace: str, limit: int = MAX_SUMMARY_PODS) -> str:
+    pods = snapshot.by_namespace.get(namespace, [])
+    if not pods:
+        return f"No pods found in namespace {namespace}."
+    phases = Counter(pod.phase for pod in pods)
+    unhealthy = sorted((pod for pod in pods if not pod.healthy), key=lambda pod: pod.restart_count, reverse=True)
+    lines = [
+        f"Namespace {namespace}: {len(pods)} pods ("
+        + ", ".join(f"{phase} {count}" for phase, count in phases.most_common())
+        + f"), {len(unhealthy)} unhealthy"
+    ]
+    if unhealthy:
+        lines.append("Unhealthy pods:")
+        for pod in unhealthy[:limit]:
+            problems = "; ".join(f"{container_label(c)}: {describe_container_state(c)}" for c in pod.failing_containers)
+            owner = f" [{pod.owner}]" if pod.owner else ""
+            lines.append(f"- {pod.name}{owner} status={pod.status} ready={pod.ready} restarts={pod.restart_count}"
+                         + (f" | {problems}" if problems else ""))
+        if len(unhealthy) > limit:
+            lines.append(f"... and {len(unhealthy) - limit} more unhealthy pods")
+
+    healthy_by_owner = Counter(pod.owner or "<no owner>" for pod in pods if pod.healthy)
+    if healthy_by_owner:
+        lines.append("Healthy pods by owner:")
+        for owner, count in healthy_by_owner.most_common(limit):
+            lines.append(f"- {owner}: {count}")
+    return "\n".join(lines)
+
+
+def summarize_pod(pod: PodRecord, events: list) -> str:
+    lines = [
+        f"Pod {pod.name} (namespace {pod.namespace}, node {pod.node or '<none>'}, owner {pod.owner or '<none>'})",
+        f"Status: {pod.status} (phase {pod.phase}), ready {pod.ready}, restarts {pod.restart_count}",
+    ]
+    if pod.labels:
+        lines.append("Labels: " + ", ".join(f"{k}={v}" for k, v in pod.labels.items()))
+    if pod.conditions:
+        lines.append("Conditions: " + ", ".join(
+            f"{c.type}={c.status}" + (f" ({c.reason})" if c.reason else "") for c in pod.conditions))
+    for container in pod.init_containers + pod.containers:
+        kind = "Init container" if container.init else "Container"
+        lines.append(f"{kind} {container.name} ({container.image}): {describe_container_state(container)}, "
+                     f"ready={container.ready}, restarts={container.restart_count}")
+        if container.message:
+            lines.append(f"  message: {container.message}")
+        if container.command:
+            lines.append(f"  command: {container.command}")
+        if container.env_refs:
+            lines.append("  env: " + "; ".join(container.env_refs))
+        if container.limits or container.requests:
+            lines.append(f"  limits: {container.limits or '<none>'}, requests: {container.requests or '<none>'}")
+    lines.append("Events:")
+    lines.append(summarize_events(events) if events else "  <none>")
+    return "\n".join(lines)
+
+
+def summarize_events(events: list, limit: int = MAX_SUMMARY_EVENTS) -> str:
+    if not events:
+        return "No events found."
+    # Collapse repeats of the same reason on the same object; warnings first, then most recent
+    grouped = {}
+    for event in events:
+        key = (event.type, event.reason, event.object_kind, event.object_name)
+        if key not in grouped:
+            grouped[key] = EventRecord(**vars(event))
+        else:
+            group = grouped[key]
+            group.count += event.count
+            if event.last_seen >= group.last_seen:
+                group.last_seen = event.last_seen
+                group.message = event.message
+    ordered = sorted(grouped.values(), key=lambda e: e.last_seen, reverse=True)
+    ordered.sort(key=lambda e: e.type != "Warning")
+    lines = [f"- {e.type} {e.reason} {e.object_kind.lower()}/{e.object_name} (x{e.count}, {format_age(e.last_seen)} ago): {e.message}"
+             for e in ordered[:limit]]
+    if len(ordered) > limit:
+        lines.append(f"... and {len(ordered) - limit} more event groups")
+    return "\n".join(lines)
+
+
+def format_age(timestamp: str) -> str:
+    if not timestamp:
+        return "<unknown>"
+    # Covers both "2025-01-01T00:00:00Z" and MicroTime values like "2025-01-01T00:00:00.000000Z"
+    created = datetime.strptime(timestamp[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+    seconds = int((datetime.now(timezone.utc) - created).total_seconds())
+    for unit, size in [("d", 86400), ("h", 3600), ("m", 60)]:
+        if seconds >= size:
+            return f"{seconds // size}{unit}"
+    return f"{max(seconds, 0)}s"
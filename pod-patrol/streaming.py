@@ -0,0 +1,75 @@
+# File: pod-patrol/streaming.py
+
+import json
+import sys
+
+"""
+Terminal output for streamed agent runs (Runner.run_streamed).
+StreamPrinter.event() takes each stream event as it arrives: text deltas are written straight to the terminal and
+tool calls/outputs are shown as progress lines. With a prefix (one per candidate) and show_tokens=False it only
+prints progress, so concurrent candidates stay readable; vote() prints each verifier's vote and the candidate's
+partial score as soon as that verifier finishes.
+"""
+
+# Max characters of tool arguments shown on a progress line
+MAX_ARGUMENT_CHARS = 120
+
+
+class StreamPrinter():
+    def __init__(self, prefix: str = "", show_tokens: bool = True):
+        self.prefix = prefix
+        self.show_tokens = show_tokens
+        self.mid_line = False
+        self.printed_text = False
+        self.tool_names = {}  # call_id -> tool name, to label tool outputs
+
+    def line(self, text: str):
+        if self.mid_line:
+            sys.stdout.write("\n")
+            self.mid_line = False
+        print(f"{self.prefix}{text}", flush=True)
+
+    def event(self, event):
+        if event.type == "raw_response_event":
+            if self.show_tokens and getattr(event.data, "type", "") == "response.output_text.delta":
+                sys.stdout.write(event.data.delta)
+                sys.stdout.flush()
+                self.mid_line = not event.data.delta.endswith("\n")
+                self.printed_text = True
+            return
+        if event.type != "run_item_stream_event":
+            return
+        if event.name == "tool_called":
+            raw_item = event.item.raw_item
+            name = getattr(raw_item, "name", "tool")
+            self.tool_names[getattr(raw_item, "call_id", "")] = name
+            self.line(f"-> {name}({format_arguments(getattr(raw_item, 'arguments', ''))})")
+        elif event.name == "tool_output":
+            raw_item = event.item.raw_item
+            call_id = raw_item.get("call_id", "") if isinstance(raw_item, dict) else getattr(raw_item, "call_id", "")
+            self.line(f"<- {self.tool_names.get(call_id, 'tool')}: {len(str(event.item.output))} chars")
+        elif event.name == "message_output_created" and not self.show_tokens:
+            self.line("answer ready, verifying...")
+
+    def vote(self, name: str, vote, votes: list):
+        # votes: every vote received so far for this candidate (None = abstained)
+        counted = [v for v in votes if v is not None]
+        score = f"{sum(counted)}/{len(counted)}" if counted else "n/a"
+        abstained = len(votes) - len(counted)
+        self.line(f"{name}: {'abstained' if vote is None else vote} (score so far {score}"
+                  + (f", {abstained} abstained" if abstained else "") + ")")
+
+    def finish(self):
+        if self.mid_line:
+            sys.stdout.write("\n")
+            self.mid_line = False
+
+
+def format_arguments(arguments: str) -> str:
+    try:
+        # Only the arguments the agent actually set; empty strings, zeros and false are the tools' defaults
+        values = {key: value for key, value in json.loads(arguments).items() if value not in ["", 0, False, None]}
+        text = ", ".join(f"{key}={value}" for key, value in values.items())
+    except (ValueError, AttributeError):
+        text = str(arguments)
+    return text if len(text) <= MAX_ARGUMENT_CHARS else text[:MAX_ARGUMENT_CHARS] + "..."
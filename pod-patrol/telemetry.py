@@ -0,0 +1,152 @@
+# File: pod-patrol/telemetry.py
+
+import asyncio
+import contextvars
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from constants import TRACE_MAX_SPANS
+
+"""
+Lightweight spans and metrics for the agent pipeline.
+tracer.span(name, **attributes) times a block and nests under whatever span is current (asyncio tasks
+inherit the current span, so gathered candidates/verifiers/tools land under the right parent).
+Counters added with propagate=True (tokens, cache hits) roll up into every ancestor, so a question span
+carries the totals of everything it ran. Finished spans can be exported as OTLP/JSON and summarized
+per stage in a table at the end of a run.
+"""
+
+current_span = contextvars.ContextVar("pod_patrol_current_span", default=None)
+
+
+class Span():
+    def __init__(self, name: str, parent, attributes: dict):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.started = time.perf_counter()
+        self.duration = None
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def add(self, key: str, amount=1, propagate: bool = False):
+        span = self
+        while span is not None:
+            span.attributes[key] = span.attributes.get(key, 0) + amount
+            span = span.parent if propagate else None
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+        self.end_ns = self.start_ns + int(self.duration * 1e9)
+
+
+class NoopSpan():
+    # Returned by active_span() outside any span so callers never need to check
+    def set(self, key: str, value):
+        pass
+
+    def add(self, key: str, amount=1, propagate: bool = False):
+        pass
+
+
+def active_span():
+    return current_span.get() or NoopSpan()
+
+
+def record_usage(result, span=None):
+    # Adds the token usage of an agents RunResult to the span and its ancestors
+    span = span or active_span()
+    for response in getattr(result, "raw_responses", None) or []:
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            continue
+        span.add("tokens.input", usage.input_tokens, propagate=True)
+        span.add("tokens.output", usage.output_tokens, propagate=True)
+        span.add("tokens.total", usage.total_tokens, propagate=True)
+
+
+def otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Tracer():
+    def __init__(self, max_spans: int = TRACE_MAX_SPANS):
+        self.spans = deque(maxlen=max_spans)
+
+    @contextmanager
+    def span(self, name: str, activate: bool = True, **attributes):
+        # activate=False records the span without making it the parent of spans started inside the block;
+        # use it around async generators, whose body interleaves with the consumer's code.
+        span = Span(name, current_span.get(), attributes)
+        token = current_span.set(span) if activate else None
+        try:
+            yield span
+        except asyncio.CancelledError:
+            span.status = "cancelled"
+            raise
+        except BaseException as e:
+            span.status = "error"
+            span.set("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            if token is not None:
+                current_span.reset(token)
+            span.finish()
+            self.spans.append(span)
+
+    def export(self, path: str):
+        # OTLP/JSON layout (resourceSpans -> scopeSpans -> spans), readable by OTLP-compatible tooling
+        spans = [
+            {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent.span_id if span.parent else "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [{"key": key, "value": otlp_value(value)} for key, value in span.attributes.items()],
+                "status": {"code": 2 if span.status == "error" else 1, "message": span.status},
+            }
+            for span in self.spans
+        ]
+        document = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "pod-patrol"}}]},
+            "scopeSpans": [{"scope": {"name": "pod-patrol"}, "spans": spans}],
+        }]}
+        with open(path, "w") as f:
+            json.dump(document, f, indent=1)
+
+    def summary_table(self) -> str:
+        stages = {}
+        for span in self.spans:
+            stage = stages.setdefault(span.name, {"count": 0, "total": 0.0, "max": 0.0, "tokens": 0, "hits": 0, "errors": 0})
+            stage["count"] += 1
+            stage["total"] += span.duration
+            stage["max"] = max(stage["max"], span.duration)
+            stage["tokens"] += span.attributes.get("tokens.total", 0)
+            stage["hits"] += span.attributes.get("cache_hits", 0)
+            stage["errors"] += span.status != "ok"
+        header = f"{'Stage':<28}{'Count':>7}{'Total s':>10}{'Mean s':>9}{'Max s':>9}{'Tokens':>10}{'Cache hits':>12}{'Errors':>8}"
+        lines = [header, "-" * len(header)]
+        for name, stage in sorted(stages.items(), key=lambda item: item[1]["total"], reverse=True):
+            lines.append(f"{name:<28}{stage['count']:>7}{stage['total']:>10.2f}{stage['total'] / stage['count']:>9.2f}"
+                         f"{stage['max']:>9.2f}{stage['tokens']:>10}{stage['hits']:>12}{stage['errors']:>8}")
+        return "\n".join(lines)
+
+
+tracer = Tracer()
@@ -0,0 +1,7 @@
+# File: pod-patrol/tests/conftest.py
+
+import os
+import sys
+
+# The pod-patrol modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
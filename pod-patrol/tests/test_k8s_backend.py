@@ -0,0 +1,66 @@
+# File: pod-patrol/tests/test_k8s_backend.py
+
+import asyncio
+import httpx
+import pytest
+from k8s_backend import ApiBackend, KubernetesBackendError, checked_name
+
+TRAVERSALS = ["../secrets/db-creds?", "..", "db/creds", "web%2F..", "Web", "-n", "--kubeconfig=/tmp/x", ""]
+
+
+def api_backend(requests: list) -> ApiBackend:
+    # Every request the backend sends is recorded and answered with an empty list
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, text="{}\n")
+    backend = ApiBackend("http://k8s.invalid")
+    backend.client = httpx.AsyncClient(base_url=backend.server, transport=httpx.MockTransport(handler))
+    return backend
+
+async def collect(iterator) -> list:
+    return [item async for item in iterator]
+
+
+@pytest.mark.parametrize("name", TRAVERSALS)
+def test_api_backend_refuses_names_outside_dns_1123(name):
+    requests = []
+    backend = api_backend(requests)
+    calls = [
+        lambda: backend.get_pod(name, "default"),
+        lambda: backend.get_pod("web", name),
+        lambda: backend.list_events(name),
+        lambda: collect(backend.stream_logs(name, "default")),
+        lambda: collect(backend.stream_logs("web", name)),
+    ]
+    if name:
+        # "" means all namespaces for list_pods / watch_pods and the default container for stream_logs
+        calls += [
+            lambda: backend.list_pods(name),
+            lambda: collect(backend.watch_pods(name)),
+            lambda: collect(backend.stream_logs("web", "default", container=name)),
+        ]
+    for call in calls:
+        with pytest.raises(KubernetesBackendError) as error:
+            asyncio.run(call())
+        assert error.value.status_code == 400
+    assert requests == []
+
+
+def test_api_backend_builds_paths_from_valid_names():
+    requests = []
+    backend = api_backend(requests)
+    asyncio.run(backend.get_pod("web-7d9f.v2", "payments"))
+    asyncio.run(collect(backend.stream_logs("web-0", "payments", container="app")))
+    asyncio.run(backend.list_pods(""))
+    assert [request.url.path for request in requests] == [
+        "/api/v1/namespaces/payments/pods/web-7d9f.v2",
+        "/api/v1/namespaces/payments/pods/web-0/log",
+        "/api/v1/pods",
+    ]
+    assert requests[1].url.params["container"] == "app"
+
+
+def test_checked_name_limits_length():
+    assert checked_name("a" * 253, "pod") == "a" * 253
+    with pytest.raises(KubernetesBackendError):
+        checked_name("a" * 254, "pod")
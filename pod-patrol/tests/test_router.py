@@ -0,0 +1,39 @@
+# File: pod-patrol/tests/test_router.py
+
+import pytest
+from router import route_question, ROUTE_LOOKUP, ROUTE_SIMPLE, ROUTE_DIAGNOSIS
+
+
+@pytest.mark.parametrize("question, lookup, namespace, pod_name", [
+    ("list pods in payments", "pods", "payments", ""),
+    ("list pods in payments?", "pods", "payments", ""),
+    ("show events in payments", "events", "payments", ""),
+    ("show logs for api-7f9c in payments", "logs", "payments", "api-7f9c"),
+    ("describe pod api-7f9c in payments", "describe", "payments", "api-7f9c"),
+    ("list pods in the payments namespace", "pods", "payments", ""),
+    ("list pods -n payments", "pods", "payments", ""),
+    ("list pods", "pods", "default", ""),
+    ("describe pod api-7f9c", "describe", "default", "api-7f9c"),
+])
+def test_lookup_reads_the_named_namespace(question, lookup, namespace, pod_name):
+    route = route_question(question)
+    assert (route.tier, route.lookup, route.namespace, route.pod_name) == (ROUTE_LOOKUP, lookup, namespace, pod_name)
+
+
+@pytest.mark.parametrize("question", [
+    "list pods in all namespaces",
+    "list pods across all namespaces",
+    "list pods --all-namespaces",
+    "list pods -A",
+    "list pods in the cluster",
+    "list pods in Payments",
+    "list pods in pending state",
+    "show logs for api-7f9c in the last hour",
+    "list pods -n payments -n checkout",
+])
+def test_lookup_with_unclear_namespace_goes_to_an_agent(question):
+    assert route_question(question).tier == ROUTE_SIMPLE
+
+
+def test_diagnosis_questions_skip_lookup():
+    assert route_question("why are pods in payments crashing?").tier == ROUTE_DIAGNOSIS
@@ -0,0 +1,69 @@
+# File: pod-patrol/tests/test_service.py
+
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+import pytest
+from agent_wrapper import AgentWrapper, starter_run_config
+from context_manager import ContextManager
+from judge_agent import candidate_answer_agent, o3_mini_run_config
+from k8s_backend import set_backend
+from replay import FixtureBackend, ScriptedModel, ScriptedModelProvider
+from service import answer_question
+from constants import CANDIDATE_CONCURRENCY, VERIFIER_TIMEOUT, ADAPTIVE_SCORE_THRESHOLD
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmark_fixtures")
+
+
+class RecordingModel(ScriptedModel):
+    # Keeps what every model turn was sent, as the model sees it
+    def __init__(self, fixture: dict):
+        super().__init__(fixture)
+        self.turns_seen = []
+
+    async def get_response(self, system_instructions, input, **kwargs):
+        self.turns_seen.append((system_instructions or "", input if isinstance(input, str) else json.dumps(input)))
+        return await super().get_response(system_instructions, input, **kwargs)
+
+
+class RecordingProvider(ScriptedModelProvider):
+    def get_model(self, model_name: str) -> RecordingModel:
+        if model_name not in self.models:
+            self.models[model_name] = RecordingModel(self.fixture)
+        return self.models[model_name]
+
+    def agent_inputs(self) -> list:
+        return [input for model in self.models.values() for instructions, input in model.turns_seen
+                if "verifier" not in instructions.lower()]
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    with open(os.path.join(FIXTURE_DIR, "crash-loop.json")) as f:
+        fixture = json.load(f)
+    set_backend(FixtureBackend(fixture, latency_scale=0))
+    provider = RecordingProvider(fixture)
+    for run_config in [starter_run_config, o3_mini_run_config]:
+        monkeypatch.setattr(run_config, "model_provider", provider)
+        monkeypatch.setattr(run_config, "tracing_disabled", True)
+    yield provider
+    set_backend(None)
+
+
+@pytest.mark.parametrize("validate", [False, True])
+def test_partial_rule_matches_reach_the_model(provider, validate):
+    inputs = SimpleNamespace(
+        no_routing=False, no_rules=False, validate_solution=validate, candidate_num=2,
+        candidate_concurrency=CANDIDATE_CONCURRENCY, early_exit=True, verifier_timeout=VERIFIER_TIMEOUT,
+        adaptive=False, score_threshold=ADAPTIVE_SCORE_THRESHOLD, stream=None, verifier_tools=False,
+        no_prefetch=True,
+    )
+    agent = AgentWrapper(candidate_answer_agent, prefetch=False)
+    answer, _ = asyncio.run(answer_question(inputs, "Why are pods failing in default?", ContextManager(), agent, None))
+    assert "DATABASE_URL" in answer
+    agent_inputs = provider.agent_inputs()
+    assert agent_inputs
+    for agent_input in agent_inputs:
+        assert "Known failure signatures matched" in agent_input
+        assert "missing-env-var" in agent_input
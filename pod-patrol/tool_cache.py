@@ -0,0 +1,63 @@
+# File: pod-patrol/tool_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from constants import TOOL_CACHE_TTL, TOOL_CACHE_MAX_ENTRIES
+
+"""
+Keyed TTL cache that sits in front of the kubectl tools.
+Keys are tuples that start with the namespace, e.g. ("default", "describe_pod", "my-pod"),
+so a whole namespace can be invalidated at once. When the cache is full the least recently
+used entry is evicted. A single module-level instance (tool_cache) is shared by every
+candidate and verifier agent.
+"""
+
+
+class TTLCache():
+    def __init__(self, ttl: float = TOOL_CACHE_TTL, max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple):
+        # Returns the cached value, or None if missing or expired
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: tuple, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, *key_prefix):
+        # invalidate() clears everything, invalidate("default") drops one namespace,
+        # invalidate("default", "describe_pod", "my-pod") drops a single entry.
+        with self.lock:
+            if not key_prefix:
+                self.entries.clear()
+                return
+            for key in [k for k in self.entries if k[:len(key_prefix)] == key_prefix]:
+                del self.entries[key]
+
+    def __len__(self):
+        return len(self.entries)
+
+
+tool_cache = TTLCache()
@@ -1,70 +1,192 @@
 # File: pod-patrol/tools.py
 
-import subprocess
+import asyncio
 from agents import function_tool
 from context_manager import ContextManager
+from tool_cache import tool_cache
+from k8s_backend import get_backend, KubernetesBackendError
+from snapshot import ClusterSnapshot, pod_from_json, summarize_pods, summarize_pod, summarize_events
+from log_filter import LogFilter
+from pod_watcher import warm_pod_list
+from telemetry import tracer, active_span
+from diagnosis import PodDiagnosis, log_fingerprint, group_diagnoses, render_groups
+from constants import LOG_TAIL_LINES, LOG_MAX_TAIL_LINES, DIAGNOSIS_CONCURRENCY, DIAGNOSIS_LOG_LINES, DIAGNOSIS_LOG_CHARS
 
 # Example usage:
-# output = run_command("kubectl get pods -l app=faulty-app")
-# print("Command output:", output)
+# snapshot = await load_snapshot("default")
+# print(summarize_pods(snapshot, "default"))
+
+# cache_key -> [task, number of callers waiting on it]
+inflight_calls = {}
+
+async def fetch_and_cache(cache_key: tuple, fetch):
+    # Only successful results are cached so errors are retried on the next call
+    result = await fetch()
+    tool_cache.set(cache_key, result)
+    return result
+
+async def run_backend_call(cache_key: tuple, fetch):
+    cached = tool_cache.get(cache_key)
+    if cached is not None:
+        active_span().add("cache_hits", propagate=True)
+        return cached
+    active_span().add("cache_misses", propagate=True)
+    # Agents asking for the same thing at the same time share one backend call.
+    # The call is only cancelled (killing kubectl) once every caller waiting on it is cancelled.
+    entry = inflight_calls.get(cache_key)
+    if entry is None:
+        entry = [asyncio.ensure_future(fetch_and_cache(cache_key, fetch)), 0]
+        inflight_calls[cache_key] = entry
+    entry[1] += 1
+    try:
+        return await asyncio.shield(entry[0])
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            entry[0].cancel()
+            if inflight_calls.get(cache_key) is entry:
+                del inflight_calls[cache_key]
+
+async def load_snapshot(namespace: str) -> ClusterSnapshot:
+    # Pods and events of one namespace, fetched together and cached as a single snapshot
+    async def fetch():
+        backend = get_backend()
+        # A warm pod watcher already has the pod list; only events need fetching then
+        pod_list = warm_pod_list(namespace)
+        if pod_list is None:
+            pod_list, event_list = await asyncio.gather(backend.list_pods(namespace), backend.list_events(namespace))
+        else:
+            event_list = await backend.list_events(namespace)
+        return ClusterSnapshot.from_json(pod_list, event_list)
+    return await run_backend_call((namespace, "snapshot"), fetch)
+
+async def fresh_snapshot(namespace: str) -> ClusterSnapshot:
+    # Fetched now rather than up to TOOL_CACHE_TTL ago; it replaces the cached snapshot, so the tools reuse it
+    tool_cache.invalidate(namespace, "snapshot")
+    return await load_snapshot(namespace)
+
+async def run_tool(name: str, work, **attributes) -> str:
+    # Turns backend failures into the error strings the agents already know how to read
+    with tracer.span(f"tool.{name}", **attributes) as span:
+        try:
+            return await work
+        except KubernetesBackendError as e:
+            span.set("error", str(e))
+            return f"Command error: {e}"
+        except Exception as e:
+            span.set("error", f"{type(e).__name__}: {e}")
+            return f"Exception occurred: {e}"
+
+async def pods_summary(namespace: str) -> str:
+    return summarize_pods(await load_snapshot(namespace), namespace)
+
+async def pod_summary(pod_name: str, namespace: str) -> str:
+    snapshot = await load_snapshot(namespace)
+    pod = snapshot.get_pod(pod_name, namespace)
+    if pod is None:
+        # Not in the cached list (e.g. created since); ask for it directly
+        pod = pod_from_json(await run_backend_call((namespace, "pod", pod_name),
+                                                   lambda: get_backend().get_pod(pod_name, namespace)))
+    return summarize_pod(pod, snapshot.pod_events(pod))
+
+async def logs_summary(pod_name: str, namespace: str, container: str, previous: bool, tail_lines: int,
+                       since_seconds: int, pattern: str, min_severity: str) -> str:
+    # Filtering happens line by line while the stream is read; the full log is never held in memory
+    log_filter = LogFilter(pattern, min_severity)
+    stream = get_backend().stream_logs(pod_name, namespace, container, previous, tail_lines, since_seconds)
+    async for line in stream:
+        log_filter.feed(line)
+    return log_filter.finish()
+
+async def cached_logs_summary(pod_name: str, namespace: str, container: str = "", previous: bool = False,
+                              tail_lines: int = 0, since_seconds: int = 0, pattern: str = "", min_severity: str = "") -> str:
+    tail_lines = min(tail_lines or LOG_TAIL_LINES, LOG_MAX_TAIL_LINES)
+    since_seconds = max(since_seconds, 0)
+    if not container:
+        # "" is the pod's only container; naming it lets both forms of the call share one cache entry
+        snapshot = tool_cache.get((namespace, "snapshot"))
+        pod = snapshot.get_pod(pod_name, namespace) if snapshot is not None else None
+        if pod is not None and len(pod.containers) == 1:
+            container = pod.containers[0].name
+    cache_key = (namespace, "logs", pod_name, container, previous, tail_lines, since_seconds, pattern, min_severity)
+    return await run_backend_call(cache_key, lambda: logs_summary(
+        pod_name, namespace, container, previous, tail_lines, since_seconds, pattern, min_severity))
+
+async def events_summary(namespace: str) -> str:
+    return summarize_events((await load_snapshot(namespace)).events)
+
+async def diagnose_pod(pod, snapshot: ClusterSnapshot, semaphore: asyncio.Semaphore) -> PodDiagnosis:
+    # Describe data comes from the snapshot; only the logs of the failing container are fetched
+    failing = pod.failing_containers or pod.containers
+    container = failing[0].name if failing else ""
+    # A crash-looping container's useful output is usually in its previous run
+    previous = bool(failing) and failing[0].restart_count > 0 and failing[0].state != "running"
+    log_filter = LogFilter(max_chars=DIAGNOSIS_LOG_CHARS)
+    log_error = ""
+    async with semaphore:
+        try:
+            async for line in get_backend().stream_logs(pod.name, pod.namespace, container, previous, DIAGNOSIS_LOG_LINES, 0):
+                log_filter.feed(line)
+        except KubernetesBackendError as e:
+            log_error = f"Command error: {e}"
+        except Exception as e:
+            # One pod's logs failing must not fail the whole namespace diagnosis
+            log_error = f"Exception occurred: {e}"
+    excerpt = log_filter.finish()
+    return PodDiagnosis(pod, snapshot.pod_events(pod), container, excerpt, log_fingerprint(log_filter, pod.name), log_error)
+
+async def namespace_diagnosis(namespace: str) -> str:
+    snapshot = await load_snapshot(namespace)
+    semaphore = asyncio.Semaphore(DIAGNOSIS_CONCURRENCY)
+    diagnoses = await asyncio.gather(*[diagnose_pod(pod, snapshot, semaphore) for pod in snapshot.unhealthy_pods(namespace)])
+    return render_groups(namespace, group_diagnoses(diagnoses), len(snapshot.by_namespace.get(namespace, [])))
 
 # -------------------------------
 # Tool 1: Get Pods
 # -------------------------------
 @function_tool(
     name_override="K8s_Get_Pods",
-    description_override="Lists all pods in the specified namespace (defaults to 'default')."
+    description_override="Summarizes pods in the specified namespace (defaults to 'default'): phase counts, unhealthy pods with container states, and healthy pods grouped by owner."
 )
-def get_pods(namespace: str) -> str:
+async def get_pods(namespace: str) -> str:
     print('running get_pods')
-    try:
-        cmd = f"kubectl get pods -n {namespace}"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=60)
-        if result.returncode != 0:
-            return f"Command error: {result.stderr.strip()}"
-        return result.stdout.strip()
-    except Exception as e:
-        return f"Exception occurred: {e}"
+    return await run_tool("get_pods", pods_summary(namespace), namespace=namespace)
 
 # -------------------------------
 # Tool 2: Describe Pod
 # -------------------------------
 @function_tool(
     name_override="K8s_Describe_Pod",
-    description_override="Shows details for a specific pod in the specified namespace (defaults to 'default'). Requires 'pod_name'."
+    description_override="Shows a compact description of a specific pod in the specified namespace (defaults to 'default'): container states, exit codes, env references, conditions and events. Requires 'pod_name'."
 )
-def describe_pod(pod_name: str, namespace: str) -> str:
+async def describe_pod(pod_name: str, namespace: str) -> str:
     print('running describe_pod')
     if not pod_name:
         return "Error: 'pod_name' is required for action 'describe_pods'."
-    try:
-        cmd = f"kubectl describe pod {pod_name} -n {namespace}"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=60)
-        if result.returncode != 0:
-            return f"Command error: {result.stderr.strip()}"
-        return result.stdout.strip()
-    except Exception as e:
-        return f"Exception occurred: {e}"
+    return await run_tool("describe_pod", pod_summary(pod_name, namespace), namespace=namespace, pod=pod_name)
 
 # -------------------------------
 # Tool 3: Get Logs
 # -------------------------------
 @function_tool(
     name_override="K8s_Get_Logs",
-    description_override="Fetches logs for a specific pod in the specified namespace (defaults to 'default'). Requires 'pod_name'."
+    description_override=(
+        "Fetches recent logs for a specific pod in the specified namespace (defaults to 'default'). Requires 'pod_name'. "
+        "'container' picks a container in multi-container pods ('' for the default one), 'previous' reads the last "
+        f"terminated container (useful for crash loops), 'tail_lines' limits lines read (0 = {LOG_TAIL_LINES}, max "
+        f"{LOG_MAX_TAIL_LINES}), 'since_seconds' only reads newer lines (0 = no limit), 'pattern' is a regex lines must "
+        "match ('' = all) and 'min_severity' is one of debug/info/warning/error/critical ('' = all). "
+        "Repeated stack traces and repeated lines are collapsed."
+    )
 )
-def get_logs(pod_name: str, namespace: str) -> str:
+async def get_logs(pod_name: str, namespace: str, container: str, previous: bool, tail_lines: int,
+                   since_seconds: int, pattern: str, min_severity: str) -> str:
     print('running get_logs')
     if not pod_name:
         return "Error: 'pod_name' is required for action 'get_logs'."
-    try:
-        cmd = f"kubectl logs {pod_name} -n {namespace}"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=60)
-        if result.returncode != 0:
-            return f"Command error: {result.stderr.strip()}"
-        return result.stdout.strip()
-    except Exception as e:
-        return f"Exception occurred: {e}"
+    return await run_tool("get_logs", cached_logs_summary(pod_name, namespace, container, previous, tail_lines,
+                                                          since_seconds, pattern, min_severity),
+                          namespace=namespace, pod=pod_name)
 
 # -------------------------------
 # Tool 4: Get Events
@@ -73,30 +195,24 @@ def get_logs(pod_name: str, namespace: str) -> str:
     name_override="K8s_Get_Events",
     description_override="Lists events in the specified namespace. Can default to 'default' if not specified."
 )
-def get_events(namespace: str) -> str:
+async def get_events(namespace: str) -> str:
     print('running get_events')
-    try:
-        cmd = f"kubectl get events -n {namespace}"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=60)
-        if result.returncode != 0:
-            return f"Command error: {result.stderr.strip()}"
-        return result.stdout.strip()
-    except Exception as e:
-        return f"Exception occurred: {e}"
+    return await run_tool("get_events", events_summary(namespace), namespace=namespace)
 
 # -------------------------------
-# Helper function to process pod names (optional)
+# Tool 5: Diagnose Unhealthy Pods
 # -------------------------------
-# def process_pod_names(output: str):
-#     lines = output.splitlines()
-#     if len(lines) > 1:
-#         # Assume the first line is a header.
-#         for line in lines[1:]:
-#             print("line: " + line)
-#             columns = line.split()
-#             if len(columns) >= 5:
-#                 pod_name = columns[0]
-#                 ready = columns[1]
-#                 status = columns[2]
-#                 restarts = columns[3]
-#                 age = columns[4]
\ No newline at end of file
+@function_tool(
+    name_override="K8s_Diagnose_Unhealthy_Pods",
+    description_override=(
+        "Diagnoses every unhealthy pod in the specified namespace (defaults to 'default') in one call: collects each "
+        "pod's status, events and recent logs concurrently, groups pods that fail the same way (same reason, exit code "
+        "and log error) and returns one representative per group. Prefer this over describing pods one by one when "
+        "several pods are failing."
+    )
+)
+async def diagnose_unhealthy_pods(namespace: str) -> str:
+    print('running diagnose_unhealthy_pods')
+    return await run_tool("diagnose_unhealthy_pods", run_backend_call((namespace, "diagnosis"),
+                                                                      lambda: namespace_diagnosis(namespace)),
+                          namespace=namespace)